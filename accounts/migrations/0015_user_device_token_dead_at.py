@@ -0,0 +1,18 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_remove_prompthistory_conversation_id_conversation_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='device_token_dead_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
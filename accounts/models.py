@@ -89,6 +89,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     country = models.CharField(max_length=100, default="Canada")
     
     device_token = models.TextField(null=True, blank=False)
+    # set when FCM reports the token unregistered/invalid; fan-outs skip it until the app sends a new one
+    device_token_dead_at = models.DateTimeField(null=True, blank=True)
     device_type = models.CharField(default=DeviceType.Android, choices=DeviceType, max_length=50)
     
     objects = UserManager()
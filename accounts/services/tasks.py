@@ -68,16 +68,24 @@ def send_otp(email, verification_code):
 @celery_app.task(name="send_account_verification_email")
 def send_account_verification_email(email):
     logger.info("verification email for user: {}".format(email))
+    from django.utils import timezone
+    from reminders.services.outbox import NotificationOutboxDrainer, NotificationOutboxWriter, email_entry
+
     user = User.objects.get(email=email)
 
-    send_template_email(
+    # through the outbox: a retried or repeated verification sends this email once
+    outbox = NotificationOutboxWriter()
+    outbox.add(email_entry(
+        user.id,
+        "account_verified",
+        timezone.now().date(),
         "otp_verification.html",
-        email,
         "Account Verification Successful",
-        **{
-            "username": user.first_name + ' ' + user.last_name,
-        },
-    )
+        username=user.first_name + ' ' + user.last_name,
+    ))
+    outbox.close()
+    # sent right here on the critical queue, not behind the reminder fan-out in the shared drain
+    NotificationOutboxDrainer(kinds=["account_verified"]).drain(max_batches=1)
     logger.info("Account verified successfully: {}".format(email))
 
 @celery_app.task(name="send_reset_request_mail")
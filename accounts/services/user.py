@@ -51,6 +51,7 @@ class UserService:
             )
         self.user.device_token = device_token
         self.user.device_type = device_type
+        self.user.device_token_dead_at = None
         self.user.save()
         
         return self.user, self.__get_tokens_for_user()
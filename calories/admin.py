@@ -5,7 +5,10 @@ from .models import (
     SuggestedWorkout,
     LoggedMeal,
     LoggedWorkout,
-    UserCalorieStreak
+    UserCalorieStreak,
+    FoodNutritionEstimate,
+    BarcodeProduct,
+    DailyNutritionRollup
 )
 
 
@@ -61,3 +64,24 @@ class LoggedWorkoutAdmin(admin.ModelAdmin):
     list_display = ("user", "title", "date", "duration_minutes", "estimated_calories_burned", "intensity")
     search_fields = ("user__username", "title", "description")
     list_filter = ("intensity", "date")
+
+
+@admin.register(FoodNutritionEstimate)
+class FoodNutritionEstimateAdmin(admin.ModelAdmin):
+    list_display = ("food_name", "unit", "region", "calories", "protein", "carbs", "fats", "created_at")
+    search_fields = ("lookup_key", "food_name")
+    list_filter = ("unit", "region")
+
+
+@admin.register(BarcodeProduct)
+class BarcodeProductAdmin(admin.ModelAdmin):
+    list_display = ("barcode", "product_name", "calories_per_100g", "quantity_grams", "source", "refreshed_at")
+    search_fields = ("barcode", "product_name")
+    list_filter = ("source",)
+
+
+@admin.register(DailyNutritionRollup)
+class DailyNutritionRollupAdmin(admin.ModelAdmin):
+    list_display = ("user", "date", "calories", "suggested_calories", "calories_burned", "updated_at")
+    search_fields = ("user__email",)
+    list_filter = ("date",)
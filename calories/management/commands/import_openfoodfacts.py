@@ -0,0 +1,123 @@
+import csv
+import gzip
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...models import BarcodeProduct
+from ...services.barcode import product_fields_from_openfoodfacts
+
+UPDATE_FIELDS = [
+    "product_name",
+    "calories_per_100g",
+    "protein_per_100g",
+    "carbs_per_100g",
+    "fats_per_100g",
+    "quantity_grams",
+    "serving_size",
+    "source",
+    "refreshed_at",
+    "updated_at",
+]
+
+
+class Command(BaseCommand):
+    help = "Bulk load products from an OpenFoodFacts JSONL or CSV (tab separated) dump into the barcode store"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Dump file, optionally gzipped (.jsonl, .json, .csv, .tsv)")
+        parser.add_argument("--format", choices=["jsonl", "csv"], help="Defaults to the file extension")
+        parser.add_argument("--delimiter", default="\t", help="CSV delimiter, OpenFoodFacts exports use tabs")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--min-scans", type=int, default=0,
+            help="Skip products scanned fewer times than this (unique_scans_n), keeps the table to popular items"
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        dump_format = options["format"] or self._guess_format(path)
+        batch_size = options["batch_size"]
+        min_scans = options["min_scans"]
+
+        # product_name/nutriment columns can be huge in the CSV export
+        csv.field_size_limit(sys.maxsize)
+
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            handle = opener(path, "rt", encoding="utf-8", newline="")
+        except OSError as e:
+            raise CommandError(f"Could not open {path}: {e}")
+
+        imported = skipped = 0
+        batch = []
+        with handle:
+            rows = self._read_jsonl(handle) if dump_format == "jsonl" else csv.DictReader(handle, delimiter=options["delimiter"])
+            for product in rows:
+                record = self._to_record(product, min_scans)
+                if record is None:
+                    skipped += 1
+                    continue
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    imported += self._flush(batch)
+                    batch = []
+                    self.stdout.write(f"Imported {imported} products...")
+            imported += self._flush(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} products, skipped {skipped}."))
+
+    @staticmethod
+    def _guess_format(path):
+        name = path[:-3] if path.endswith(".gz") else path
+        if name.endswith((".jsonl", ".json")):
+            return "jsonl"
+        if name.endswith((".csv", ".tsv")):
+            return "csv"
+        raise CommandError("Cannot tell the dump format from the file name, pass --format")
+
+    def _read_jsonl(self, handle):
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                self.stderr.write(f"Skipping malformed line {line_number}")
+
+    @staticmethod
+    def _to_record(product, min_scans):
+        barcode = str(product.get("code") or "").strip()
+        if not barcode or len(barcode) > 32:
+            return None
+        if min_scans:
+            try:
+                if int(product.get("unique_scans_n") or 0) < min_scans:
+                    return None
+            except (TypeError, ValueError):
+                return None
+
+        fields = product_fields_from_openfoodfacts(product)
+        if not any(fields[key] for key in ("calories_per_100g", "protein_per_100g", "carbs_per_100g", "fats_per_100g")):
+            # no nutrition facts, a live lookup would reject it anyway
+            return None
+
+        now = timezone.now()
+        return BarcodeProduct(barcode=barcode, source="import", refreshed_at=now, **fields)
+
+    @staticmethod
+    def _flush(batch):
+        if not batch:
+            return 0
+        # dumps repeat codes, the last occurrence wins
+        unique = list({record.barcode: record for record in batch}.values())
+        BarcodeProduct.objects.bulk_create(
+            unique,
+            update_conflicts=True,
+            unique_fields=["barcode"],
+            update_fields=UPDATE_FIELDS,
+        )
+        return len(unique)
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:17
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calories', '0017_alter_suggestedmeal_options_loggedmeal_quantity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodNutritionEstimate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lookup_key', models.CharField(max_length=255, unique=True)),
+                ('food_name', models.CharField(max_length=200)),
+                ('unit', models.CharField(max_length=20)),
+                ('region', models.CharField(blank=True, default='', max_length=100)),
+                ('calories', models.FloatField()),
+                ('protein', models.FloatField(default=0)),
+                ('carbs', models.FloatField(default=0)),
+                ('fats', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
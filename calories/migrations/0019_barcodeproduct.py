@@ -0,0 +1,36 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:19
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calories', '0018_foodnutritionestimate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BarcodeProduct',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('barcode', models.CharField(max_length=32, unique=True)),
+                ('product_name', models.CharField(default='Unknown', max_length=255)),
+                ('calories_per_100g', models.FloatField(default=0)),
+                ('protein_per_100g', models.FloatField(default=0)),
+                ('carbs_per_100g', models.FloatField(default=0)),
+                ('fats_per_100g', models.FloatField(default=0)),
+                ('quantity_grams', models.FloatField(blank=True, help_text='Parsed pack size in grams/ml', null=True)),
+                ('serving_size', models.CharField(blank=True, default='', max_length=100)),
+                ('source', models.CharField(choices=[('api', 'OpenFoodFacts API'), ('import', 'OpenFoodFacts dump')], default='api', max_length=10)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
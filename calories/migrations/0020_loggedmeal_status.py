@@ -0,0 +1,23 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calories', '0019_barcodeproduct'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loggedmeal',
+            name='failure_reason',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='loggedmeal',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=10),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:23
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calories', '0020_loggedmeal_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutritionRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('calories', models.IntegerField(default=0)),
+                ('protein', models.IntegerField(default=0)),
+                ('carbs', models.IntegerField(default=0)),
+                ('fats', models.IntegerField(default=0)),
+                ('calories_burned', models.IntegerField(default=0)),
+                ('suggested_calories', models.IntegerField(default=0)),
+                ('suggested_protein', models.IntegerField(default=0)),
+                ('suggested_carbs', models.IntegerField(default=0)),
+                ('suggested_fats', models.IntegerField(default=0)),
+                ('suggested_calories_burned', models.IntegerField(default=0)),
+                ('by_meal_type', models.JSONField(blank=True, default=dict)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_nutrition_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-date',),
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calories', '0021_dailynutritionrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailynutritionrollup',
+            name='health_insight',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dailynutritionrollup',
+            name='health_insight_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
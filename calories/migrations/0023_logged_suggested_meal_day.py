@@ -0,0 +1,42 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_day(apps, schema_editor):
+    # one UPDATE per table; new rows get the day from Model.save()
+    for model_name in ("LoggedMeal", "SuggestedMeal"):
+        model = apps.get_model("calories", model_name)
+        model.objects.filter(date__isnull=False).update(day=TruncDate("date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calories', '0022_dailynutritionrollup_health_insight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loggedmeal',
+            name='day',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='suggestedmeal',
+            name='day',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_day, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='loggedmeal',
+            index=models.Index(fields=['user', 'day'], name='loggedmeal_user_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suggestedmeal',
+            index=models.Index(fields=['calorie_goal', 'day', 'meal_type'], name='suggestedmeal_goal_day_idx'),
+        ),
+    ]
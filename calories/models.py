@@ -1,3 +1,5 @@
+import hashlib
+from datetime import date, datetime
 from django.db import models
 from accounts.models import User
 from calories.choices import ReminderChoices
@@ -27,6 +29,23 @@ MEASUREMENT_UNITS = [
     ("slice", "Slice"),
 ]
 
+LOGGED_MEAL_STATUSES = [
+    ("pending", "Pending"),
+    ("completed", "Completed"),
+    ("failed", "Failed"),
+]
+
+def day_of(value):
+    """Calendar day (in the project time zone) of a date, datetime or ISO string; None stays None."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value) if "T" in value or " " in value else date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
 class UserCalorieStreak(BaseModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="calorie_streak")
     current_streak = models.IntegerField(default=0)
@@ -124,14 +143,22 @@ class SuggestedMeal(BaseModel):
     carbs = models.IntegerField(default=0)
     fats = models.IntegerField(default=0)
     is_template = models.BooleanField(default=False)  # Distinguish reusable meals
+    # plain copy of date's calendar day so per-day filters can use the composite index
+    day = models.DateField(blank=True, null=True, editable=False)
     
     def __str__(self):
         return f'{self.calorie_goal.user.first_name} - {self.meal_type} {"(template)" if self.is_template else ""}'
 
+    def save(self, *args, **kwargs):
+        self.day = day_of(self.date)
+        super().save(*args, **kwargs)
 
     class Meta:
         unique_together = ("calorie_goal", "created_at", "meal_type", "food_item")
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["calorie_goal", "day", "meal_type"], name="suggestedmeal_goal_day_idx"),
+        ]
         
 class SuggestedWorkout(BaseModel):
     calorie_goal = models.ForeignKey(CalorieQA, on_delete=models.CASCADE)
@@ -162,12 +189,25 @@ class LoggedMeal(BaseModel):
     measurement_unit = models.CharField(max_length=10, choices=MEASUREMENT_UNITS, default="serving")
     number_of_servings_or_gram_or_slices = models.PositiveBigIntegerField(default=1)
     quantity = models.FloatField(default=1.0)
+    # async logging saves the meal first and fills in the macros from a background task;
+    # only completed rows count as logged food (lists, rollups, streaks, reminders)
+    status = models.CharField(max_length=10, choices=LOGGED_MEAL_STATUSES, default="completed")
+    failure_reason = models.TextField(blank=True, null=True)
+    # plain copy of date's calendar day so per-day filters can use the composite index
+    day = models.DateField(blank=True, null=True, editable=False)
     
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["user", "day"], name="loggedmeal_user_day_idx"),
+        ]
         
     def __str__(self):
         return f'{self.user} logged meal'
+
+    def save(self, *args, **kwargs):
+        self.day = day_of(self.date)
+        super().save(*args, **kwargs)
     
 class LoggedWorkout(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -183,4 +223,114 @@ class LoggedWorkout(BaseModel):
         ordering = ("-created_at",)
 
     def __str__(self):
-        return f"{self.user}'s workout on {self.date}"
\ No newline at end of file
+        return f"{self.user}'s workout on {self.date}"
+
+class FoodNutritionEstimate(BaseModel):
+    """
+    Per-unit macros for a normalized food description (e.g. "boiled egg" per piece,
+    "jollof rice" per plate), so repeat descriptions are priced locally instead of
+    being sent to the AI again.
+    """
+    lookup_key = models.CharField(max_length=255, unique=True)
+    food_name = models.CharField(max_length=200)
+    unit = models.CharField(max_length=20)
+    region = models.CharField(max_length=100, blank=True, default="")
+    calories = models.FloatField()
+    protein = models.FloatField(default=0)
+    carbs = models.FloatField(default=0)
+    fats = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.food_name} per {self.unit} ({self.region or 'any'})"
+
+    def as_macros(self) -> dict:
+        return {
+            "food_name": self.food_name,
+            "calories": self.calories,
+            "protein": self.protein,
+            "carbs": self.carbs,
+            "fats": self.fats,
+        }
+
+
+class BarcodeProduct(BaseModel):
+    """
+    Local copy of an OpenFoodFacts product, nutriments per 100 g. Checked before any
+    network call; rows come from live lookups or from an offline dump import.
+    """
+    SOURCE_CHOICES = [
+        ("api", "OpenFoodFacts API"),
+        ("import", "OpenFoodFacts dump"),
+    ]
+
+    barcode = models.CharField(max_length=32, unique=True)
+    product_name = models.CharField(max_length=255, default="Unknown")
+    calories_per_100g = models.FloatField(default=0)
+    protein_per_100g = models.FloatField(default=0)
+    carbs_per_100g = models.FloatField(default=0)
+    fats_per_100g = models.FloatField(default=0)
+    quantity_grams = models.FloatField(blank=True, null=True, help_text="Parsed pack size in grams/ml")
+    serving_size = models.CharField(max_length=100, blank=True, default="")
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default="api")
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.product_name} ({self.barcode})"
+
+
+class DailyNutritionRollup(BaseModel):
+    """
+    One row per user and day with everything the dashboard screens show: logged and
+    suggested totals, burn, and a per-meal-type breakdown. Rebuilt from the source
+    rows whenever a meal or workout for that day is written or deleted.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_nutrition_rollups")
+    date = models.DateField()
+    calories = models.IntegerField(default=0)
+    protein = models.IntegerField(default=0)
+    carbs = models.IntegerField(default=0)
+    fats = models.IntegerField(default=0)
+    calories_burned = models.IntegerField(default=0)
+    suggested_calories = models.IntegerField(default=0)
+    suggested_protein = models.IntegerField(default=0)
+    suggested_carbs = models.IntegerField(default=0)
+    suggested_fats = models.IntegerField(default=0)
+    suggested_calories_burned = models.IntegerField(default=0)
+    # {"breakfast": {"logged": {"calories": .., "protein": .., "carbs": .., "fats": ..}, "suggested": {...}}, ...}
+    by_meal_type = models.JSONField(default=dict, blank=True)
+    # last good AI insight and the totals it was written for
+    health_insight = models.TextField(blank=True, null=True)
+    health_insight_fingerprint = models.CharField(max_length=64, blank=True, default="")
+
+    class Meta:
+        ordering = ("-date",)
+        unique_together = ("user", "date")
+
+    def __str__(self):
+        return f"{self.user} nutrition on {self.date}"
+
+    def meal_type_totals(self, meal_type, kind="logged"):
+        """Sums for one meal type, or None when nothing was logged/suggested for it."""
+        return self.by_meal_type.get(meal_type, {}).get(kind)
+
+    def macros_percent(self):
+        total_macros = self.protein + self.fats + self.carbs
+
+        def share(grams):
+            return {
+                "percentage": round((grams / total_macros) * 100, 1) if total_macros else 0,
+                "grams": round(grams, 1)
+            }
+
+        return {"protein": share(self.protein), "fat": share(self.fats), "carbs": share(self.carbs)}
+
+    def insight_fingerprint(self, calorie_goal) -> str:
+        """Changes whenever anything the health insight prompt is built from changes."""
+        raw = f"{calorie_goal}|{self.calories}|{self.protein}|{self.fats}|{self.carbs}"
+        return hashlib.sha256(raw.encode()).hexdigest()
@@ -0,0 +1,197 @@
+import logging
+import re
+import threading
+from datetime import timedelta
+
+import requests
+from django.core.cache import cache
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from rest_framework.exceptions import ValidationError
+from urllib3.util.retry import Retry
+
+from ..models import BarcodeProduct
+
+logger = logging.getLogger(__name__)
+
+OPENFOODFACTS_PRODUCT_URL = "https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
+REQUEST_TIMEOUT = (3.05, 10)  # connect, read
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """One keep-alive session per process so misses reuse the TLS connection to OpenFoodFacts."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=16,
+                    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+                )
+                session.mount("https://", adapter)
+                session.headers.update({"User-Agent": "Niigma/1.0 (barcode lookup)"})
+                _session = session
+    return _session
+
+
+def extract_grams(text):
+    match = re.search(r'([\d.]+)\s*(g|kg|ml|l)', str(text or "").lower())
+    if match:
+        try:
+            value = float(match.group(1))
+        except ValueError:
+            return None
+        unit = match.group(2)
+        if unit == "kg":
+            return value * 1000
+        elif unit == "l":
+            return value * 1000  # assuming density similar to water
+        return value
+    return None
+
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def product_fields_from_openfoodfacts(product: dict) -> dict:
+    """
+    Maps an OpenFoodFacts product (API/JSONL shape with a `nutriments` dict, or a flat
+    CSV row) to BarcodeProduct fields.
+    """
+    nutriments = product.get("nutriments") or product
+
+    quantity_grams = _to_float(product.get("product_quantity"), None)
+    if not quantity_grams:
+        quantity_grams = extract_grams(product.get("quantity")) or extract_grams(product.get("serving_size"))
+
+    return {
+        "product_name": (product.get("product_name") or "Unknown")[:255],
+        "calories_per_100g": _to_float(nutriments.get("energy-kcal_100g")),
+        "protein_per_100g": _to_float(nutriments.get("proteins_100g")),
+        "carbs_per_100g": _to_float(nutriments.get("carbohydrates_100g")),
+        "fats_per_100g": _to_float(nutriments.get("fat_100g")),
+        "quantity_grams": quantity_grams or None,
+        "serving_size": (product.get("serving_size") or "")[:100],
+    }
+
+
+class BarcodeProductStore:
+    """
+    Barcode lookups, cheapest tier first: Redis, then the BarcodeProduct table, then
+    OpenFoodFacts. Stale rows are still served and refreshed in the background.
+    """
+
+    cache_timeout = 60 * 60 * 24
+    not_found_timeout = 60 * 60
+    stale_after = timedelta(days=30)
+
+    @staticmethod
+    def cache_key(barcode: str) -> str:
+        return f"barcode_product:{barcode}"
+
+    @staticmethod
+    def to_payload(product: BarcodeProduct) -> dict:
+        return {
+            "barcode": product.barcode,
+            "name": product.product_name,
+            "calories": product.calories_per_100g,
+            "protein": product.protein_per_100g,
+            "carbs": product.carbs_per_100g,
+            "fats": product.fats_per_100g,
+            "quantity_grams": product.quantity_grams,
+            "serving_size": product.serving_size,
+            "refreshed_at": product.refreshed_at.isoformat(),
+        }
+
+    def get(self, barcode: str) -> dict:
+        """Per-100g nutriments and parsed pack size for `barcode`."""
+        barcode = str(barcode).strip()
+        key = self.cache_key(barcode)
+
+        payload = cache.get(key)
+        if payload is not None:
+            if payload.get("not_found"):
+                self._raise_not_found()
+            self._refresh_if_stale(barcode, payload["refreshed_at"])
+            return payload
+
+        product = BarcodeProduct.objects.filter(barcode=barcode).first()
+        if product is None:
+            product = self.fetch_and_store(barcode)
+
+        payload = self.to_payload(product)
+        cache.set(key, payload, self.cache_timeout)
+        self._refresh_if_stale(barcode, payload["refreshed_at"])
+        return payload
+
+    def fetch_and_store(self, barcode: str) -> BarcodeProduct:
+        """Network lookup; persists the product so the next scan never leaves the building."""
+        try:
+            response = get_http_session().get(
+                OPENFOODFACTS_PRODUCT_URL.format(barcode=barcode), timeout=REQUEST_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f"RequestException: {e}")
+            raise ValidationError(
+                {"message": "Could not connect to barcode nutrition API. Please try again later.", "status": "failed"}, code=400
+            )
+
+        if response.status_code != 200:
+            logger.error(f"Barcode lookup failed with status {response.status_code}")
+            raise ConnectionError("Unable to fetch data from food database.")
+
+        data = response.json()
+        product = data.get("product", {}) if data.get("status") == 1 else {}
+        if not product or not product.get("nutriments"):
+            cache.set(self.cache_key(barcode), {"not_found": True}, self.not_found_timeout)
+            if data.get("status") != 1:
+                self._raise_not_found()
+            raise ValidationError(
+                {"message": "Product information is incomplete or missing for this barcode.", "status": "failed"},
+                code=400
+            )
+
+        stored, _ = BarcodeProduct.objects.update_or_create(
+            barcode=barcode,
+            defaults={
+                **product_fields_from_openfoodfacts(product),
+                "source": "api",
+                "refreshed_at": timezone.now(),
+            },
+        )
+        logger.info(f"name: {stored.product_name}")
+        return stored
+
+    def refresh(self, barcode: str):
+        """Re-fetches a product and replaces the cached copy."""
+        try:
+            product = self.fetch_and_store(barcode)
+        except (ValidationError, ConnectionError) as e:
+            logger.warning(f"Could not refresh barcode {barcode}: {e}")
+            return
+        cache.set(self.cache_key(barcode), self.to_payload(product), self.cache_timeout)
+
+    def _refresh_if_stale(self, barcode: str, refreshed_at: str):
+        if timezone.datetime.fromisoformat(refreshed_at) > timezone.now() - self.stale_after:
+            return
+        # one refresh per barcode per day, however many scans hit the stale copy
+        if not cache.add(f"{self.cache_key(barcode)}:refreshing", "1", timeout=60 * 60 * 24):
+            return
+        from calories.services.tasks import refresh_barcode_product
+        refresh_barcode_product.delay(barcode)
+
+    @staticmethod
+    def _raise_not_found():
+        raise ValidationError(
+            {"message": "No product found for the given barcode.", "status": "failed"},
+            code=400
+        )
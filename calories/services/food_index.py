@@ -0,0 +1,242 @@
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from fractions import Fraction
+
+from cachetools import LRUCache
+from django.db import IntegrityError
+from rest_framework import serializers
+
+from utils.helpers.ai_service import OpenAIClient
+from ..models import FoodNutritionEstimate
+
+logger = logging.getLogger(__name__)
+
+# canonical unit -> spellings users type
+UNIT_ALIASES = {
+    "g": ["g", "gr", "gram", "grams", "gm", "gms"],
+    "kg": ["kg", "kgs", "kilo", "kilos", "kilogram", "kilograms"],
+    "ml": ["ml", "milliliter", "milliliters", "millilitre", "millilitres"],
+    "l": ["l", "liter", "liters", "litre", "litres"],
+    "oz": ["oz", "ounce", "ounces"],
+    "lb": ["lb", "lbs", "pound", "pounds"],
+    "cup": ["cup", "cups"],
+    "tbsp": ["tbsp", "tablespoon", "tablespoons"],
+    "tsp": ["tsp", "teaspoon", "teaspoons"],
+    "plate": ["plate", "plates"],
+    "bowl": ["bowl", "bowls"],
+    "slice": ["slice", "slices"],
+    "piece": ["piece", "pieces", "pc", "pcs"],
+    "wrap": ["wrap", "wraps"],
+    "serving": ["serving", "servings", "portion", "portions"],
+}
+UNIT_LOOKUP = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+
+# mass/volume units are priced per 100 g / 100 ml
+MASS_IN_GRAMS = {"g": 1, "kg": 1000, "oz": 28.35, "lb": 453.6}
+VOLUME_IN_ML = {"ml": 1, "l": 1000}
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "half": 0.5, "dozen": 12,
+}
+STOP_WORDS = {"of", "and", "with", "x", "the", "some"}
+
+# the request's measurement_unit -> basis unit
+MEASUREMENT_UNIT_BASIS = {
+    "serving": "serving", "servings": "serving",
+    "gram": "100g", "grams": "100g",
+    "slice": "slice", "slices": "slice",
+}
+
+_TOKEN_RE = re.compile(r"\d+/\d+|\d+(?:\.\d+)?|[a-z]+")
+_NUMBER_UNIT_RE = re.compile(r"(\d)([a-z])")
+
+
+def _singular(token: str) -> str:
+    """Lookup-key only: "eggs" and "egg" share an index entry. Never shown to users."""
+    if len(token) <= 3 or token.endswith(("ss", "us")):  # hummus, couscous, asparagus
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("oes", "ches", "shes")):
+        return token[:-2]
+    if token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def _as_number(token: str):
+    if token in NUMBER_WORDS:
+        return NUMBER_WORDS[token]
+    try:
+        return float(Fraction(token))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+@dataclass
+class FoodPortion:
+    """A description reduced to what the index is keyed on, plus how much of it was eaten."""
+    food_key: str
+    food_name: str
+    unit: str
+    units: float
+
+    @property
+    def unit_label(self) -> str:
+        return {"100g": "100 g", "100ml": "100 ml", "piece": "piece (one item)"}.get(self.unit, self.unit)
+
+
+def parse_food_description(description: str, measurement_unit: str = "serving", amount: float = 1) -> FoodPortion:
+    """
+    Lowercases, tokenizes and canonicalizes a free-text description like "2 boiled eggs"
+    or "jollof rice 1 plate" and combines it with the request's unit and amount.
+    """
+    text = _NUMBER_UNIT_RE.sub(r"\1 \2", str(description or "").lower())
+    quantity, unit, words = None, None, []
+    for token in _TOKEN_RE.findall(text):
+        number = _as_number(token)
+        if number is not None:
+            quantity = number if quantity is None else quantity * number
+            continue
+        if token in UNIT_LOOKUP and unit is None:
+            unit = UNIT_LOOKUP[token]
+            continue
+        if token in STOP_WORDS:
+            continue
+        words.append(token)
+
+    food_name = " ".join(words) or str(description).strip().lower()
+    food_key = " ".join(sorted({_singular(word) for word in words})) or food_name
+    amount = float(amount or 1)
+    counted = quantity is not None
+    quantity = quantity if counted else 1
+
+    basis = MEASUREMENT_UNIT_BASIS.get(str(measurement_unit or "serving").lower(), "serving")
+    if basis == "100g":
+        # a weight written in the description ("200g chicken") wins, else the request's grams
+        grams = quantity * MASS_IN_GRAMS[unit] if unit in MASS_IN_GRAMS else amount
+        return FoodPortion(food_key, food_name, "100g", grams / 100)
+    if unit in MASS_IN_GRAMS:
+        return FoodPortion(food_key, food_name, "100g", quantity * MASS_IN_GRAMS[unit] / 100 * amount)
+    if unit in VOLUME_IN_ML:
+        return FoodPortion(food_key, food_name, "100ml", quantity * VOLUME_IN_ML[unit] / 100 * amount)
+    if unit:
+        return FoodPortion(food_key, food_name, unit, quantity * amount)
+    if basis == "slice":
+        return FoodPortion(food_key, food_name, "slice", quantity * amount)
+    if counted:
+        # "2 boiled eggs", "an apple": counted items
+        return FoodPortion(food_key, food_name, "piece", quantity * amount)
+    return FoodPortion(food_key, food_name, "serving", amount)
+
+
+class FoodNutritionIndex:
+    """
+    Hot in-process LRU over the FoodNutritionEstimate table; the AI is only asked
+    for the per-unit macros of a food/unit/region it has never seen.
+    """
+
+    _lru = LRUCache(maxsize=4096)
+    _lru_lock = threading.Lock()
+
+    def __init__(self, region: str = ""):
+        self.region = (region or "").strip().lower()
+
+    def lookup_key(self, portion: FoodPortion) -> str:
+        return f"{portion.food_key}|{portion.unit}|{self.region}"[:255]
+
+    def get_unit_macros(self, portion: FoodPortion) -> dict:
+        key = self.lookup_key(portion)
+        with self._lru_lock:
+            macros = self._lru.get(key)
+        if macros is not None:
+            return macros
+
+        entry = FoodNutritionEstimate.objects.filter(lookup_key=key).first()
+        if entry is None:
+            entry = self._estimate_and_store(key, portion)
+        macros = entry.as_macros()
+
+        with self._lru_lock:
+            self._lru[key] = macros
+        return macros
+
+    def estimate(self, description: str, measurement_unit: str = "serving", amount: float = 1) -> dict:
+        """Macros for `amount` x `measurement_unit` of `description`, multiplied out locally."""
+        portion = parse_food_description(description, measurement_unit, amount)
+        macros = self.get_unit_macros(portion)
+        return {
+            "food_name": macros["food_name"],
+            "calories": macros["calories"] * portion.units,
+            "protein": macros["protein"] * portion.units,
+            "carbs": macros["carbs"] * portion.units,
+            "fats": macros["fats"] * portion.units,
+        }
+
+    def _estimate_and_store(self, key: str, portion: FoodPortion) -> FoodNutritionEstimate:
+        unit_macros = self._ask_ai(portion)
+        try:
+            entry, _ = FoodNutritionEstimate.objects.get_or_create(
+                lookup_key=key,
+                defaults={
+                    "unit": portion.unit,
+                    "region": self.region,
+                    **unit_macros,
+                },
+            )
+        except IntegrityError:
+            # another worker priced the same food first
+            entry = FoodNutritionEstimate.objects.get(lookup_key=key)
+        return entry
+
+    def _ask_ai(self, portion: FoodPortion) -> dict:
+        region = self.region.title() or "Canada"
+        prompt = f"""
+            You are a knowledgeable nutritionist.
+
+            Estimate the nutrition of exactly ONE {portion.unit_label} of: "{portion.food_name}".
+
+            Assume a standard recipe and portion size in {region}.
+
+            Respond ONLY in JSON with this exact format:
+            {{
+            "food_name": "Boiled Egg",
+            "calories": 78,
+            "protein": 6.3,
+            "fats": 5.3,
+            "carbs": 0.6
+            }}
+            """
+
+        response = OpenAIClient.generate_response(prompt)
+        if not response:
+            raise serializers.ValidationError(
+                {"message": "Failed to get a response from the Niigma AI service.", "status": "failed"},
+                code=500
+            )
+
+        try:
+            data = json.loads(response)
+        except json.JSONDecodeError:
+            raise serializers.ValidationError(
+                {"message": "Niigma AI response could not be parsed as valid JSON.", "status": "failed"},
+                code=500
+            )
+
+        def clean(value):
+            try:
+                return max(0.0, float(value))
+            except (ValueError, TypeError):
+                return 0.0
+
+        return {
+            "food_name": str(data.get("food_name") or portion.food_name.title())[:200],
+            "calories": clean(data.get("calories")),
+            "protein": clean(data.get("protein")),
+            "carbs": clean(data.get("carbs")),
+            "fats": clean(data.get("fats")),
+        }
@@ -0,0 +1,80 @@
+import logging
+from datetime import date
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..models import DailyNutritionRollup, day_of, LoggedMeal, LoggedWorkout, SuggestedMeal, SuggestedWorkout
+
+logger = logging.getLogger(__name__)
+
+MACRO_FIELDS = ("calories", "protein", "carbs", "fats")
+
+
+def rollup_day(value) -> date:
+    """The calendar day a meal/workout counts towards, from a date, datetime or ISO string."""
+    return day_of(value) or timezone.localdate()
+
+
+def _totals_by_meal_type(queryset) -> dict:
+    rows = queryset.values("meal_type").annotate(**{field: Sum(field) for field in MACRO_FIELDS})
+    return {row["meal_type"]: {field: row[field] or 0 for field in MACRO_FIELDS} for row in rows}
+
+
+def _rollup_values(user_id, day) -> dict:
+    """The rollup's columns for `day`, with one grouped query per source table."""
+
+    logged = _totals_by_meal_type(LoggedMeal.objects.filter(user_id=user_id, day=day, status="completed"))
+    suggested = _totals_by_meal_type(SuggestedMeal.objects.filter(calorie_goal__user_id=user_id, day=day))
+    burned = LoggedWorkout.objects.filter(user_id=user_id, date=day).aggregate(
+        total=Sum("estimated_calories_burned")
+    )["total"] or 0
+    suggested_workout = SuggestedWorkout.objects.filter(
+        calorie_goal__user_id=user_id, date__date=day
+    ).values_list("estimated_calories_burned", flat=True).first()
+
+    by_meal_type = {}
+    for meal_type in set(logged) | set(suggested):
+        by_meal_type[meal_type] = {"logged": logged.get(meal_type), "suggested": suggested.get(meal_type)}
+
+    def total(source, field):
+        return sum(values[field] for values in source.values())
+
+    return {
+        **{field: total(logged, field) for field in MACRO_FIELDS},
+        **{f"suggested_{field}": total(suggested, field) for field in MACRO_FIELDS},
+        "calories_burned": burned,
+        "suggested_calories_burned": suggested_workout or 0,
+        "by_meal_type": by_meal_type,
+    }
+
+
+def refresh_daily_rollup(user_id, day) -> DailyNutritionRollup:
+    """Rebuilds and stores one user's rollup for `day`; called from the write paths."""
+    day = rollup_day(day)
+    rollup, _ = DailyNutritionRollup.objects.update_or_create(
+        user_id=user_id, date=day, defaults=_rollup_values(user_id, day)
+    )
+    return rollup
+
+
+def get_daily_rollup(user, day) -> DailyNutritionRollup:
+    """
+    One indexed lookup on the read path. A day with no stored rollup is built on read
+    and only stored when it has something in it, so reads of arbitrary (e.g. future,
+    empty) dates never create rows; the unsaved rollup that comes back is all zeros.
+    """
+    day = rollup_day(day)
+    rollup = DailyNutritionRollup.objects.filter(user=user, date=day).first()
+    if rollup is not None:
+        return rollup
+    values = _rollup_values(user.id, day)
+    if values["by_meal_type"] or values["calories_burned"] or values["suggested_calories_burned"]:
+        rollup, _ = DailyNutritionRollup.objects.update_or_create(user_id=user.id, date=day, defaults=values)
+        return rollup
+    return DailyNutritionRollup(user=user, date=day, **values)
+
+
+def invalidate_daily_rollups(user_id, days):
+    """For bulk writes that skip the per-row refresh; the next read rebuilds these days."""
+    DailyNutritionRollup.objects.filter(user_id=user_id, date__in={rollup_day(day) for day in days}).delete()
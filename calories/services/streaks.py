@@ -0,0 +1,92 @@
+import logging
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import LoggedMeal, LoggedWorkout, UserCalorieStreak
+
+logger = logging.getLogger(__name__)
+
+
+class CalorieStreakEngine:
+    """
+    Streaks computed from the set of days each user logged a meal or a workout, as
+    consecutive-day islands in one SQL statement, instead of a read-modify-write per log.
+    """
+
+    # day - row_number() is constant across a run of consecutive days, so each
+    # (user_id, grp) is one streak; the current one is the run that reaches yesterday/today.
+    RECOMPUTE_SQL = """
+        WITH logged_days AS (
+            SELECT user_id, day FROM {meal_table}
+            WHERE day IS NOT NULL AND day <= %(today)s AND status = 'completed' {meal_user_filter}
+            UNION
+            SELECT user_id, date AS day FROM {workout_table}
+            WHERE date <= %(today)s {workout_user_filter}
+        ),
+        islands AS (
+            SELECT user_id, day,
+                   day - (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day))::int AS grp
+            FROM logged_days
+        ),
+        runs AS (
+            SELECT user_id, MAX(day) AS end_day, COUNT(*) AS length
+            FROM islands
+            GROUP BY user_id, grp
+        ),
+        summary AS (
+            SELECT user_id,
+                   MAX(CASE WHEN end_day >= %(yesterday)s THEN length ELSE 0 END) AS current_streak,
+                   MAX(length) AS longest_streak,
+                   MAX(end_day) AS last_streak_date
+            FROM runs
+            GROUP BY user_id
+        )
+        INSERT INTO {streak_table} (id, created_at, updated_at, user_id, current_streak, longest_streak, last_streak_date)
+        SELECT gen_random_uuid(), NOW(), NOW(), user_id, current_streak, longest_streak, last_streak_date
+        FROM summary
+        ON CONFLICT (user_id) DO UPDATE SET
+            current_streak = EXCLUDED.current_streak,
+            longest_streak = GREATEST({streak_table}.longest_streak, EXCLUDED.longest_streak),
+            last_streak_date = EXCLUDED.last_streak_date,
+            updated_at = NOW()
+    """
+
+    @classmethod
+    def recompute(cls, user_ids=None, today=None) -> int:
+        """
+        Recomputes current/longest streaks for `user_ids`, or for everyone when None.
+        Returns the number of streak rows written.
+        """
+        today = today or timezone.now().date()
+        params = {"today": today, "yesterday": today - timedelta(days=1)}
+        meal_user_filter = workout_user_filter = ""
+        if user_ids is not None:
+            user_ids = [str(user_id) for user_id in user_ids]
+            if not user_ids:
+                return 0
+            params["user_ids"] = user_ids
+            meal_user_filter = workout_user_filter = "AND user_id = ANY(%(user_ids)s::uuid[])"
+
+        sql = cls.RECOMPUTE_SQL.format(
+            meal_table=LoggedMeal._meta.db_table,
+            workout_table=LoggedWorkout._meta.db_table,
+            streak_table=UserCalorieStreak._meta.db_table,
+            meal_user_filter=meal_user_filter,
+            workout_user_filter=workout_user_filter,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    @staticmethod
+    def reset_missed(today=None) -> int:
+        """Zeroes every streak whose last logged day is before yesterday, in one UPDATE."""
+        today = today or timezone.now().date()
+        yesterday = today - timedelta(days=1)
+        return UserCalorieStreak.objects.filter(
+            Q(last_streak_date__lt=yesterday) | Q(last_streak_date__isnull=True),
+            current_streak__gt=0,
+        ).update(current_streak=0, updated_at=timezone.now())
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import logging
 import re
@@ -12,9 +13,14 @@ from uuid import uuid4
 from accounts.choices import Section
 from calories.serializers import LoggedMealSerializer, MealSource
 from utils.helpers.ai_service import OpenAIClient
+from calories.services.food_index import MEASUREMENT_UNIT_BASIS, FoodNutritionIndex, parse_food_description
+from calories.services.barcode import BarcodeProductStore
+from calories.services.rollups import get_daily_rollup, invalidate_daily_rollups, refresh_daily_rollup
+from calories.services.streaks import CalorieStreakEngine
 from accounts.models import Conversation, PromptHistory, User
+from reminders.services.tasks import send_push_notification
 import requests
-from ..models import MEAL_TYPES, CalorieQA, LoggedMeal, SuggestedMeal, SuggestedWorkout, UserCalorieStreak
+from ..models import MEAL_TYPES, CalorieQA, DailyNutritionRollup, LoggedMeal, day_of, SuggestedMeal, SuggestedWorkout, UserCalorieStreak
 from rest_framework import serializers
 from datetime import timedelta
 from django.utils import timezone
@@ -22,20 +28,18 @@ from django.utils.timezone import now
 from datetime import date
 from django.db.models import Sum
 from django.db.models import Q
+from django.db import transaction
+from django.core.cache import cache
 from celery import shared_task
 import string
 
-def extract_grams(text):
-    match = re.search(r'([\d.]+)\s*(g|kg|ml|l)', text.lower())
-    if match:
-        value = float(match.group(1))
-        unit = match.group(2)
-        if unit == "kg":
-            return value * 1000
-        elif unit == "l":
-            return value * 1000  # assuming density similar to water
-        return value
-    return None
+# A handful of distinct plans rotated over the goal timeline instead of one per day
+SUGGESTED_MEAL_PLAN_POOL_SIZE = 7
+SUGGESTED_MEAL_PLAN_POOL_CACHE_TTL = 60 * 60 * 24
+SUGGESTED_MEAL_CHUNK_SIZE = 500
+
+HEALTH_INSIGHT_FALLBACK = "Unable to generate health insight at the moment."
+HEALTH_INSIGHT_PENDING = "Your insight for today is being prepared, check back in a moment."
 
 
 def clean_string(input_string):
@@ -59,22 +63,8 @@ def reset_missed_calorie_streaks():
     Resets the calorie streaks for users who did NOT log calorie data yesterday
     and haven't already logged today.
     """
-    today = timezone.now().date()
-    yesterday = today - timedelta(days=1)
-
-    # Step 1: Get user IDs who logged calories yesterday
-    active_user_ids = set(
-        LoggedMeal.objects.filter(date=yesterday).values_list("user_id", flat=True)
-    )
-
-    # Step 2: Find streaks where user did NOT log yesterday AND hasn't already logged today
-    stale_streaks = UserCalorieStreak.objects.filter(
-        ~Q(user_id__in=active_user_ids),
-        ~Q(last_streak_date=today)
-    )
-
-    # Step 3: Update in bulk
-    updated = stale_streaks.update(current_streak=0)
+    yesterday = timezone.now().date() - timedelta(days=1)
+    updated = CalorieStreakEngine.reset_missed()
     logger.info(f"Reset {updated} calorie streak(s) due to inactivity on {yesterday}")
 
 @shared_task
@@ -85,6 +75,12 @@ def update_user_calorie_streak(user_id):
     except User.DoesNotExist:
         return
 
+@shared_task
+def recompute_calorie_streaks(user_ids=None):
+    """Bulk streak rebuild for the given users, or everyone, in a single statement."""
+    updated = CalorieStreakEngine.recompute(user_ids)
+    logger.info(f"Recomputed {updated} calorie streak(s)")
+
 @shared_task
 def async_store_logged_meal_as_suggested(user_id, logged_meal_data):
     try:
@@ -112,6 +108,113 @@ def async_store_logged_meal_as_suggested(user_id, logged_meal_data):
     )
 
 
+@shared_task
+def complete_pending_logged_meal(logged_meal_id, meal_data):
+    """
+    Fills in the macros of a meal saved by async log_meal. The AI/barcode/vision call
+    runs here, outside any transaction; the row is only touched once the result is in.
+    """
+    try:
+        logged_meal = LoggedMeal.objects.select_related("user").get(id=logged_meal_id, status="pending")
+    except LoggedMeal.DoesNotExist:
+        logger.warning(f"Pending logged meal {logged_meal_id} not found or already processed.")
+        return
+
+    user = logged_meal.user
+    try:
+        nutrition = CalorieAIAssistant(user, meal_data).extract_food_items_from_meal_source(
+            meal_data.get("meal_source"),
+            meal_data.get("number_of_servings_or_gram_or_slices", 1),
+            meal_data.get("measurement_unit"),
+            meal_data.get("food_item"),
+            meal_data.get("barcode"),
+            meal_data.get("image_url"),
+            meal_data.get("quantity", 1.0)
+        )
+        if not nutrition:
+            raise ValueError("Nutrition estimation failed")
+    except Exception as e:
+        message = e.detail.get("message", str(e)) if isinstance(getattr(e, "detail", None), dict) else str(e)
+        logger.error(f"Failed to estimate nutrition for logged meal {logged_meal_id}: {message}")
+        LoggedMeal.objects.filter(id=logged_meal_id).update(status="failed", failure_reason=str(message)[:500])
+        notify_logged_meal_result(user, "Meal not logged", "We couldn't estimate the nutrition of your meal. Please try again.")
+        return
+
+    CalorieAIAssistant.clean_meal_data_for_source(meal_data, nutrition)
+    logged_meal.food_item = (meal_data.get("food_item") or logged_meal.food_item)[:100]
+    logged_meal.number_of_servings_or_gram_or_slices = meal_data.get(
+        "number_of_servings_or_gram_or_slices", logged_meal.number_of_servings_or_gram_or_slices
+    ) or 1
+    for field in ("calories", "protein", "carbs", "fats", "image_url"):
+        if field in nutrition:
+            setattr(logged_meal, field, nutrition[field])
+    logged_meal.status = "completed"
+    logged_meal.save()
+    rollup = refresh_daily_rollup(user.id, logged_meal.date)
+    queue_health_insight_refresh(user.id, rollup.date)
+
+    update_user_calorie_streak.delay(user.id)
+    async_store_logged_meal_as_suggested.delay(user.id, {
+        "meal_type": logged_meal.meal_type,
+        "food_item": logged_meal.food_item,
+        "date": str(logged_meal.date.date() if logged_meal.date else timezone.now().date()),
+        "calories": logged_meal.calories,
+        "protein": logged_meal.protein,
+        "carbs": logged_meal.carbs,
+        "fats": logged_meal.fats,
+    })
+    notify_logged_meal_result(user, "Meal logged", f"{logged_meal.food_item}: {logged_meal.calories} kcal added to your day.")
+
+
+def notify_logged_meal_result(user, title, message):
+    if not user.allow_push_notifications or not user.device_token or user.device_token_dead_at:
+        return
+    try:
+        send_push_notification(title, message, user.device_type, user.device_token, "calorie_log")
+    except Exception as e:
+        logger.warning(f"Could not push logged meal result to {user.email}: {e}")
+
+
+@shared_task
+def generate_suggested_meals_for_goal(calorie_goal_id, regenerate_future=False):
+    """Background fill of the whole goal timeline; safe to re-run after an interruption."""
+    try:
+        calorie_goal = CalorieQA.objects.select_related("user").get(id=calorie_goal_id)
+    except CalorieQA.DoesNotExist:
+        logger.error(f"Calorie goal with ID {calorie_goal_id} does not exist.")
+        return
+    created = CalorieAIAssistant(calorie_goal.user).generate_suggested_meals(
+        calorie_goal_id, regenerate_future=regenerate_future
+    )
+    logger.info(f"Created {created} suggested meal(s) for calorie goal {calorie_goal_id}")
+
+
+@shared_task
+def refresh_daily_health_insight(user_id, day):
+    """Rewrites the day's health insight after its totals changed, off the request path."""
+    try:
+        user = User.objects.select_related("calorie_qa").get(id=user_id)
+        calorie_goal = user.calorie_qa.daily_calorie_target
+    except (User.DoesNotExist, CalorieQA.DoesNotExist):
+        return
+    rollup = get_daily_rollup(user, day)
+    if rollup._state.adding:
+        return  # nothing stored for the day (anymore), so there is nowhere to keep an insight
+    CalorieAIAssistant(user).refresh_daily_health_insight(rollup, calorie_goal)
+
+
+def queue_health_insight_refresh(user_id, day):
+    # collapses a burst of logs/reads for the same day into one model call
+    if cache.add(f"health_insight_refresh:{user_id}:{day}", "1", timeout=60):
+        refresh_daily_health_insight.delay(str(user_id), str(day))
+
+
+@shared_task
+def refresh_barcode_product(barcode):
+    """Re-fetches a stale barcode product from OpenFoodFacts without blocking the scan that noticed it."""
+    BarcodeProductStore().refresh(barcode)
+
+
 class CalorieAIAssistant:
     def __init__(self, user: User, logged_meal : LoggedMealSerializer=None):
         self.user = user
@@ -119,40 +222,19 @@ class CalorieAIAssistant:
 
     def compare_logged_vs_suggested(self, target_date: date)-> dict:
         results = {}
-        user = self.user
+        rollup = get_daily_rollup(self.user, target_date)
         for meal_type, _ in MEAL_TYPES:
-            # Get suggested meal
-            suggested = SuggestedMeal.objects.filter(
-                calorie_goal__user=user,
-                date__date=target_date,
-                meal_type=meal_type
-            ).aggregate(
-                total_calories=Sum('calories'),
-                total_protein=Sum('protein'),
-                total_carbs=Sum('carbs'),
-                total_fats=Sum('fats'),
-            )
-
-            # Get logged meal
-            logged = LoggedMeal.objects.filter(
-                user=user,
-                date__date=target_date,
-                meal_type=meal_type
-            ).aggregate(
-                total_calories=Sum('calories'),
-                total_protein=Sum('protein'),
-                total_carbs=Sum('carbs'),
-                total_fats=Sum('fats'),
-            )
+            suggested = rollup.meal_type_totals(meal_type, "suggested") or {}
+            logged = rollup.meal_type_totals(meal_type, "logged") or {}
 
             results[meal_type] = {
-                "suggested": suggested,
-                "logged": logged,
+                "suggested": {f"total_{field}": suggested.get(field) for field in ("calories", "protein", "carbs", "fats")},
+                "logged": {f"total_{field}": logged.get(field) for field in ("calories", "protein", "carbs", "fats")},
                 "difference": {
-                    "calories": (logged["total_calories"] or 0) - (suggested["total_calories"] or 0),
-                    "protein": (logged["total_protein"] or 0) - (suggested["total_protein"] or 0),
-                    "carbs": (logged["total_carbs"] or 0) - (suggested["total_carbs"] or 0),
-                    "fats": (logged["total_fats"] or 0) - (suggested["total_fats"] or 0),
+                    "calories": logged.get("calories", 0) - suggested.get("calories", 0),
+                    "protein": logged.get("protein", 0) - suggested.get("protein", 0),
+                    "carbs": logged.get("carbs", 0) - suggested.get("carbs", 0),
+                    "fats": logged.get("fats", 0) - suggested.get("fats", 0),
                 }
             }
 
@@ -599,7 +681,17 @@ class CalorieAIAssistant:
             code=500
         )
             
-    def generate_suggested_meals(self, calorie_goal_id):
+    def generate_suggested_meals(self, calorie_goal_id, pool_size=SUGGESTED_MEAL_PLAN_POOL_SIZE,
+                                 chunk_size=SUGGESTED_MEAL_CHUNK_SIZE, regenerate_future=False) -> int:
+        """
+        Fills the goal timeline with suggested meals. A small pool of distinct daily
+        plans is fetched concurrently and rotated across the days, rows are written
+        in chunks of whole days, and days already written are skipped, so an
+        interrupted run picks up where it stopped. Returns the number of rows created.
+
+        :param regenerate_future: drop the generated suggestions after today first, so an
+            edited goal (new target or eating style) is planned again from tomorrow on
+        """
         try:
             calorie_goal = CalorieQA.objects.get(id=calorie_goal_id)
         except CalorieQA.DoesNotExist:
@@ -608,45 +700,105 @@ class CalorieAIAssistant:
                 code=404
             )
 
+        if regenerate_future:
+            future = SuggestedMeal.objects.filter(
+                calorie_goal=calorie_goal, day__gt=now().date(), is_template=False
+            )
+            with transaction.atomic():
+                future_days = set(future.values_list("day", flat=True).distinct())
+                future.delete()
+                invalidate_daily_rollups(calorie_goal.user_id, future_days)
+
         start_date = calorie_goal.created_at
         end_date = calorie_goal.goal_timeline
-        daily_target = calorie_goal.daily_calorie_target
+        if not end_date or end_date < start_date:
+            return 0
 
-        # AI-generated or fallback
-        hardcoded_meals = [("breakfast", 0.3), ("lunch", 0.4), ("dinner", 0.3)]
-        meals = self.generate_daily_meal_plan(calorie_goal, start_date)
-
-        for i in range((end_date - start_date).days + 1):
-            date = start_date + timedelta(days=i)
-
-            if meals and isinstance(meals[0], dict):
-                # AI response: structured dict with actual calories
-                for meal in meals:
-                    SuggestedMeal.objects.create(
-                        calorie_goal=calorie_goal,
-                        date=date,
-                        meal_type=meal['meal_type'],
-                        food_item=meal.get('meal_name', 'Example Meal'),
-                        calories=meal['calories'],
-                        protein=meal.get('protein_g', 0),
-                        carbs=meal.get('carbs_g', 0),
-                        fats=meal.get('fat_g', 0)
-                    )
-            else:
-                # Fallback: use hardcoded ratios
-                for meal_type, ratio in hardcoded_meals:
-                    calories = int(daily_target * ratio)
-                    SuggestedMeal.objects.create(
-                        calorie_goal=calorie_goal,
-                        date=date,
-                        meal_type=meal_type,
-                        food_item=f"{meal_type.title()} Item Example",
-                        calories=calories,
-                        protein=meal.get('protein_g', 0),
-                        carbs=meal.get('carbs_g', 0),
-                        fats=meal.get('fat_g', 0)
-                    )
+        done_days = set(
+            SuggestedMeal.objects.filter(calorie_goal=calorie_goal, date__isnull=False).dates("date", "day")
+        )
+        pending_dates = [
+            start_date + timedelta(days=i)
+            for i in range((end_date - start_date).days + 1)
+            if timezone.localtime(start_date + timedelta(days=i)).date() not in done_days
+        ]
+        if not pending_dates:
+            return 0
+
+        plans = self.get_meal_plan_pool(calorie_goal, pending_dates[:pool_size])
+
+        created = 0
+        days_per_chunk = max(1, chunk_size // len(MEAL_TYPES))
+        for offset in range(0, len(pending_dates), days_per_chunk):
+            meal_entries = []
+            for index, date in enumerate(pending_dates[offset:offset + days_per_chunk], start=offset):
+                meal_entries.extend(self.build_suggested_meal_entries(calorie_goal, date, plans[index % len(plans)] if plans else None))
+            # one chunk is all or nothing, so a day is never half written
+            with transaction.atomic():
+                SuggestedMeal.objects.bulk_create(meal_entries, batch_size=chunk_size)
+                invalidate_daily_rollups(calorie_goal.user_id, {entry.date for entry in meal_entries})
+            created += len(meal_entries)
+        return created
+
+    def get_meal_plan_pool(self, calorie_goal, dates) -> list:
+        """
+        Distinct AI meal plans to rotate across the timeline. The pool is cached so a
+        resumed run doesn't pay for it twice.
+        """
+        # everything the prompt is built from that a goal edit can change
+        inputs = f"{calorie_goal.daily_calorie_target}|{calorie_goal.goal}|{calorie_goal.eating_style}"
+        cache_key = f"suggested_meal_plan_pool:{calorie_goal.id}:{hashlib.sha256(inputs.encode()).hexdigest()[:16]}"
+        plans = cache.get(cache_key)
+        if plans:
+            return plans
+
+        prompts = [
+            self.build_meal_prompt(calorie_goal, date)
+            + f"\n        This is plan {number} of a {len(dates)}-day rotation, so pick dishes that differ from a typical plan.\n"
+            for number, date in enumerate(dates, start=1)
+        ]
+        results = OpenAIClient.generate_daily_meal_plans(prompts)
+        plans = [plan for plan in results if plan and isinstance(plan, list) and isinstance(plan[0], dict)]
+        if plans:
+            cache.set(cache_key, plans, SUGGESTED_MEAL_PLAN_POOL_CACHE_TTL)
+        else:
+            logger.warning(f"No usable AI meal plans for calorie goal {calorie_goal.id}, using default ratios.")
+        return plans
+
+    def build_suggested_meal_entries(self, calorie_goal, date, meals=None) -> list:
+        if meals:
+            # AI response: structured dict with actual calories
+            return [
+                SuggestedMeal(
+                    calorie_goal=calorie_goal,
+                    date=date,
+                    day=day_of(date),
+                    meal_type=meal['meal_type'],
+                    food_item=(meal.get('meal_name') or 'Example Meal')[:100],
+                    calories=meal['calories'],
+                    protein=meal.get('protein_g', 0),
+                    carbs=meal.get('carbs_g', 0),
+                    fats=meal.get('fat_g', 0)
+                )
+                for meal in meals
+            ]
 
+        # Fallback: use hardcoded ratios
+        daily_target = calorie_goal.daily_calorie_target
+        return [
+            SuggestedMeal(
+                calorie_goal=calorie_goal,
+                date=date,
+                day=day_of(date),
+                meal_type=meal_type,
+                food_item=f"{meal_type.title()} Item Example",
+                calories=int(daily_target * ratio),
+                protein=0,
+                carbs=0,
+                fats=0
+            )
+            for meal_type, ratio in [("breakfast", 0.3), ("lunch", 0.4), ("dinner", 0.3)]
+        ]
 
     def generate_suggested_meals_for_the_day(self, calorie_goal_id, date=None, from_background=False):
         try:
@@ -658,50 +810,23 @@ class CalorieAIAssistant:
             )
 
         date = date or now().date()
-        daily_target = calorie_goal.daily_calorie_target
 
         # Prevent duplication
-        if from_background and SuggestedMeal.objects.filter(calorie_goal=calorie_goal, date=date).exists():
+        existing = SuggestedMeal.objects.filter(calorie_goal=calorie_goal, day=day_of(date))
+        if from_background and existing.exists():
             return
-        elif SuggestedMeal.objects.filter(calorie_goal=calorie_goal, date=date).exists():
-            return SuggestedMeal.objects.filter(calorie_goal=calorie_goal, date=date)
+        elif existing.exists():
+            return existing
         
         # Call AI-based suggestion
         meals = self.generate_daily_meal_plan(calorie_goal, date)
-
-        meal_entries = []
-
-        if meals and isinstance(meals[0], dict):
-            # AI-based structured meal plan
-            for meal in meals:
-                meal_entries.append(SuggestedMeal(
-                    calorie_goal=calorie_goal,
-                    date=date,
-                    meal_type=meal['meal_type'],
-                    food_item=meal.get('meal_name', 'Example Meal'),
-                    calories=meal['calories'],
-                    protein=meal.get('protein_g', 0),
-                    carbs=meal.get('carbs_g', 0),
-                    fats=meal.get('fat_g', 0)
-                ))
-        else:
-            # Fallback to hardcoded ratios
-            default_meals = [("breakfast", 0.3), ("lunch", 0.4), ("dinner", 0.3)]
-            for meal_type, ratio in default_meals:
-                meal_entries.append(SuggestedMeal(
-                    calorie_goal=calorie_goal,
-                    date=date,
-                    meal_type=meal_type,
-                    food_item=f"{meal_type.title()} Item Example",
-                    calories=int(daily_target * ratio),
-                    protein=0,
-                    carbs=0,
-                    fats=0
-                ))
-
+        meal_entries = self.build_suggested_meal_entries(
+            calorie_goal, date, meals if meals and isinstance(meals[0], dict) else None
+        )
 
         # Bulk insert meals for the day
         SuggestedMeal.objects.bulk_create(meal_entries)
+        refresh_daily_rollup(calorie_goal.user_id, date)
         
     def _extract_grams_from_serving_size(self, serving_size_str):
         # e.g. "30g", "1 slice (25 g)", etc.
@@ -734,87 +859,50 @@ class CalorieAIAssistant:
     
     def get_food_by_barcode(self, barcode: str) -> dict:
         try:
-            response = requests.get(f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json")
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get("status") != 1:
-                    raise serializers.ValidationError(
-                        {"message": "No product found for the given barcode.", "status": "failed"},
-                        code=400
-                    )
-
-                product = data.get("product", {})
-
-                if not product or not product.get("nutriments"):
-                    raise serializers.ValidationError(
-                        {"message": "Product information is incomplete or missing for this barcode.", "status": "failed"},
-                        code=400
-                    )
-
-                logger.info(f"name: {product.get('product_name', 'Unknown')}")
-                print(f"name of the product logged by barcode: {product.get('product_name', 'Unknown')}")
-
-                nutriments = product.get("nutriments", {})
-                food_name = product.get("product_name", "Unknown")
-
-                # Nutrients per 100g
-                kcal = float(nutriments.get("energy-kcal_100g", 0))
-                protein = float(nutriments.get("proteins_100g", 0))
-                carbs = float(nutriments.get("carbohydrates_100g", 0))
-                fats = float(nutriments.get("fat_100g", 0))
-
-                # Try to infer total grams from product data
-                total_grams = None
-                quantity_str = product.get("quantity", "")
-                product_quantity = product.get("product_quantity")  # numeric in grams or ml
-                serving_size = product.get("serving_size", "")
-
-                if product_quantity:
-                    total_grams = float(product_quantity)
-                elif extract_grams(quantity_str):
-                    total_grams = extract_grams(quantity_str)
-                elif extract_grams(serving_size):
-                    total_grams = extract_grams(serving_size)
-
-                # Fallback to your method if still unknown
-                if not total_grams:
-                    total_grams = self._get_weight_in_grams(
-                        self.logged_meal['measurement_unit'],
-                        food_name,
-                        self.logged_meal['number_of_servings_or_gram_or_slices'],
-                        product
-                    )
-
-                multiplier = total_grams / 100
+            product = BarcodeProductStore().get(barcode)
+            food_name = product["name"]
+            print(f"name of the product logged by barcode: {food_name}")
+
+            # Pack size parsed when the product was stored; fall back to the logged portion
+            total_grams = product["quantity_grams"]
+            if not total_grams:
+                total_grams = self._get_weight_in_grams(
+                    self.logged_meal['measurement_unit'],
+                    food_name,
+                    self.logged_meal['number_of_servings_or_gram_or_slices'],
+                    product
+                )
 
-                return {
-                    "name": food_name,
-                    "calories": round(kcal * multiplier, 2),
-                    "protein": round(protein * multiplier, 2),
-                    "carbs": round(carbs * multiplier, 2),
-                    "fats": round(fats * multiplier, 2),
-                }
+            multiplier = total_grams / 100
 
-            else:
-                logger.error(f"Barcode lookup failed with status {response.status_code}")
-                raise ConnectionError("Unable to fetch data from food database.")
+            return {
+                "name": food_name,
+                "calories": round(product["calories"] * multiplier, 2),
+                "protein": round(product["protein"] * multiplier, 2),
+                "carbs": round(product["carbs"] * multiplier, 2),
+                "fats": round(product["fats"] * multiplier, 2),
+            }
 
         except ValidationError:
             raise  # Re-raise so DRF handles it cleanly
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"RequestException: {e}")
-            raise ValidationError(
-                {"message": "Could not connect to barcode nutrition API. Please try again later.", "status": "failed"}, code=400
-            )
-
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
             raise ValidationError(
                 {"message": "Something went wrong while processing the barcode.", "status": "failed"}, code=400
             )
     
+    @staticmethod
+    def clean_meal_data_for_source(meal_data, nutrition):
+        """Moves the name/servings the source detected from `nutrition` onto the meal data."""
+        source = meal_data["meal_source"]
+        if source == MealSource.Barcode or source == MealSource.Scanned:
+            meal_data["food_item"] = nutrition.pop("food_name", meal_data.get("food_item"))
+        if source == MealSource.Scanned:
+            meal_data["number_of_servings_or_gram_or_slices"] = nutrition.pop("servings", meal_data.get("number_of_servings_or_gram_or_slices"))
+        if source == MealSource.Manual:
+            nutrition.pop("food_item", None)  # Avoid overwriting
+
     def extract_food_items_from_meal_source(self, meal_source, serving_count=1,
                                             measurement_unit="serving", food_description=None,
                                             barcode=None, scanned_image=None, quantity = 1.0) -> dict:
@@ -870,94 +958,48 @@ class CalorieAIAssistant:
         return {}
 
     def estimate_food_nutrition_from_description(self, description: str, measurement_unit: str = "serving") -> dict:
-        prompt = f"""
-        You are a nutrition assistant.
-
-        A user described the following food: "{description}"
-
-        Please provide a structured response in JSON with:
-        - "food_name": Name/title of the food
-        - "calories": Estimated calories for 1 {measurement_unit}
-        - "protein": Grams of protein per {measurement_unit}
-        - "carbs": Grams of carbs per {measurement_unit}
-        - "fats": Grams of fat per {measurement_unit}
-        - "number_of_servings_or_weight_in_grams_or_number_of_slices": Estimated serving weight in grams or slices or number of servings (if applicable)
-
-        Respond strictly in this format:
-        {{
-            "food_name": "...",
-            "title":"...",
-            "calories": ...,
-            "protein": ...,
-            "carbs": ...,
-            "fats": ...,
-            "number_of_servings_or_weight_in_grams_or_number_of_slices": ...
-        }}
         """
-        
-        response = OpenAIClient.chat(prompt)
-        serving_count: int = 1
-        try:
-            data = json.loads(response)
-            # Multiply by serving count if needed
-            return {
-                "food_name": data["food_name"],
-                "title": data["title"],
-                "calories": round(data["calories"] * serving_count),
-                "protein": round(data["protein"] * serving_count),
-                "carbs": round(data["carbs"] * serving_count),
-                "fats": round(data["fats"] * serving_count),
-                "number_of_servings_or_weight_in_grams_or_number_of_slices": data.get("number_of_servings_or_weight_in_grams_or_number_of_slices", None)
-            }
+        Nutrition for 1 `measurement_unit` of the described food, plus how many of that
+        unit the description amounts to (grams for "gram", 100 g when no weight is given).
+        Served from the local food index; the AI is only asked for foods it has never priced.
+        """
+        basis = MEASUREMENT_UNIT_BASIS.get(str(measurement_unit or "serving").lower(), "serving")
+        portion = parse_food_description(description, measurement_unit, 100 if basis == "100g" else 1)
+        per_unit = FoodNutritionIndex(getattr(self.user, "country", "Canada")).get_unit_macros(portion)
+
+        if basis == "100g":
+            # the index prices 100 g, the caller multiplies per gram
+            factor, count = 0.01, portion.units * 100
+        elif portion.unit == basis:
+            factor, count = 1, portion.units
+        else:
+            # "2 boiled eggs" as a serving: the described portion is the one unit
+            factor, count = portion.units, 1
 
-        except (KeyError, ValueError) as e:
-            raise serializers.ValidationError(
-                {"message": "Failed to extract nutrition info from Niigma AI response.", "error": str(e)},
-                code=500
-            )
+        def scaled(field):
+            value = per_unit[field] * factor
+            return round(value, 2) if basis == "100g" else round(value)
+
+        return {
+            "food_name": per_unit["food_name"],
+            "title": per_unit["food_name"],
+            "calories": scaled("calories"),
+            "protein": scaled("protein"),
+            "carbs": scaled("carbs"),
+            "fats": scaled("fats"),
+            "number_of_servings_or_weight_in_grams_or_number_of_slices": round(count, 2)
+        }
         
     
     def estimate_nutrition_with_ai(self, description, number_of_servings_or_gram_or_slices, measurement_unit) -> dict:
+        """
+        Looks the description up in the food index (per-unit macros, keyed on the normalized
+        food, unit and the user's country) and multiplies by the quantity locally.
+        """
         user_country = getattr(self.user, "country", "Canada")
-        prompt = f"""
-            You are a knowledgeable nutritionist.
-
-            Estimate total **calories**, **protein (g)**, **fats (g)**, and **carbohydrates (g)** for the following meal:
-
-            **Description:** "{description}"
-
-            The user consumed **{number_of_servings_or_gram_or_slices} {measurement_unit}(s)** 
-            (e.g., 1 serving ≈ 250g if known).
-
-            Assume standard portion sizes in {user_country} unless otherwise specified.
-
-            Respond ONLY in JSON with this exact format:
-            {{
-            "calories": 123,
-            "protein": 4,
-            "fats": 2,
-            "carbs": 25
-            }}
-            """
-
-        # Call the AI service to generate nutrition estimate
-        nutrition = OpenAIClient.generate_response(prompt)
-        
-        if not nutrition:
-            raise serializers.ValidationError(
-                {"message": "Failed to get a response from the Niigma AI service.", "status": "failed"},
-                code=500
-            )
-            
-        # Parse the JSON string into a Python dict
-        try:
-            nutrition = json.loads(nutrition)
-        except json.JSONDecodeError:
-            raise serializers.ValidationError(
-                {"message": "Niigma AI response could not be parsed as valid JSON.", "status": "failed"},
-                code=500
-            )
-        
+        nutrition = FoodNutritionIndex(user_country).estimate(
+            description, measurement_unit, number_of_servings_or_gram_or_slices
+        )
         return self._sanitize_nutrition_data(nutrition)
 
         
@@ -997,9 +1039,45 @@ class CalorieAIAssistant:
         response = OpenAIClient.generate_response(prompt)
         
         if not response:
-            return "Unable to generate health insight at the moment."
+            return HEALTH_INSIGHT_FALLBACK
         return response
 
+    def get_daily_health_insight(self, rollup, calorie_goal) -> str:
+        """
+        The insight stored on the day's rollup. The request never waits on the AI: when
+        the totals have moved on since it was written, or the day has none yet, a refresh
+        is queued and the last good insight (this day's, else the user's latest) is returned.
+        """
+        fingerprint = rollup.insight_fingerprint(calorie_goal)
+        if rollup.health_insight and rollup.health_insight_fingerprint == fingerprint:
+            return rollup.health_insight
+        if not rollup._state.adding:
+            # an empty day has no stored rollup to write an insight to
+            queue_health_insight_refresh(self.user.id, rollup.date)
+        if rollup.health_insight:
+            return rollup.health_insight
+        previous = DailyNutritionRollup.objects.filter(
+            user_id=self.user.id, date__lt=rollup.date
+        ).exclude(health_insight__isnull=True).exclude(health_insight="").order_by("-date").values_list(
+            "health_insight", flat=True
+        ).first()
+        return previous or HEALTH_INSIGHT_PENDING
+
+    def refresh_daily_health_insight(self, rollup, calorie_goal):
+        fingerprint = rollup.insight_fingerprint(calorie_goal)
+        if rollup.health_insight and rollup.health_insight_fingerprint == fingerprint:
+            return rollup.health_insight
+
+        insight = self.generate_health_insight(calorie_goal, rollup.calories, rollup.macros_percent(), rollup.date)
+        if insight == HEALTH_INSIGHT_FALLBACK:
+            return None
+
+        # only store it if the day hasn't changed again while the model was answering
+        DailyNutritionRollup.objects.filter(
+            id=rollup.id, calories=rollup.calories, protein=rollup.protein, fats=rollup.fats, carbs=rollup.carbs
+        ).update(health_insight=insight, health_insight_fingerprint=fingerprint)
+        return insight
+
             
     def generate_suggested_workout_with_ai(self, calorie_target, date):
         prompt = self.build_suggested_workout_prompt(calorie_target, date)
@@ -1021,6 +1099,7 @@ class CalorieAIAssistant:
                     "estimated_calories_burned": workout_calorie_data["estimated_calories_burned"]
                 }
             )
+        refresh_daily_rollup(self.user.id, date)
         return  None
 
     def estimate_logged_workout_calories(self, workout_description, duration, description, intensity, steps=None):
@@ -1157,23 +1236,6 @@ class CalorieAIAssistant:
             )
 
     def update_calorie_streak(self):
-        user = self.user
-        today = timezone.now().date()
-        yesterday = today - timedelta(days=1)
-
-        streak, _ = UserCalorieStreak.objects.get_or_create(user=user)
-        calorie_qa = getattr(user, "calorie_qa", None)
-        if not calorie_qa:
+        if not getattr(self.user, "calorie_qa", None):
             return
-
-        if streak.last_streak_date == today:
-            return  # already counted today
-
-        if streak.last_streak_date == yesterday:
-            streak.current_streak += 1
-        else:
-            streak.current_streak = 1
-
-        streak.longest_streak = max(streak.longest_streak, streak.current_streak)
-        streak.last_streak_date = today
-        streak.save()
\ No newline at end of file
+        CalorieStreakEngine.recompute([self.user.id])
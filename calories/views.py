@@ -1,6 +1,7 @@
 from datetime import date
 from accounts.choices import Section
-from calories.services.tasks import CalorieAIAssistant, async_store_logged_meal_as_suggested, update_user_calorie_streak
+from calories.services.rollups import get_daily_rollup, refresh_daily_rollup
+from calories.services.tasks import CalorieAIAssistant, async_store_logged_meal_as_suggested, complete_pending_logged_meal, generate_suggested_meals_for_goal, queue_health_insight_refresh, update_user_calorie_streak
 from common.responses import CustomErrorResponse, CustomSuccessResponse
 from django.utils import timezone
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -16,6 +17,7 @@ from django.db.models import Sum, F, FloatField, Value
 from django.db.models.functions import Coalesce
 from drf_spectacular.types import OpenApiTypes
 from django.db import transaction
+from django.core.exceptions import ValidationError
 import django_filters
 from rest_framework.filters import SearchFilter, OrderingFilter
 from drf_spectacular.utils import extend_schema, OpenApiParameter
@@ -65,13 +67,16 @@ class CalorieViewSet(viewsets.ModelViewSet):
             return CustomErrorResponse(message=serializer.errors, status=400)
 
         validated_data = serializer.validated_data
-        obj, created = CalorieQA.objects.update_or_create(
-            user=request.user,
-            defaults=validated_data
-        )
-        user = User.objects.get(id=request.user.id)
-        user.is_calories_setup = True
-        user.save()
+        with transaction.atomic():
+            obj, created = CalorieQA.objects.update_or_create(
+                user=request.user,
+                defaults=validated_data
+            )
+            user = User.objects.get(id=request.user.id)
+            user.is_calories_setup = True
+            user.save()
+            # fills the goal timeline with suggested meals; an edited goal re-plans its future days
+            transaction.on_commit(lambda: generate_suggested_meals_for_goal.delay(str(obj.id), not created))
         response_serializer = self.get_serializer(obj)
         message = "Calorie created successfully" if created else "Calorie updated successfully"
         return CustomSuccessResponse(data=response_serializer.data, message=message, status=201 if created else 200)
@@ -103,7 +108,9 @@ class CalorieViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return CustomErrorResponse(message=serializer.errors, status=400)
         
-        instance.save()
+        with transaction.atomic():
+            instance.save()
+            transaction.on_commit(lambda: generate_suggested_meals_for_goal.delay(str(instance.id), True))
         
         return CustomSuccessResponse(data=serializer.data, message="User updated successfully")
 
@@ -161,13 +168,16 @@ class CalorieViewSet(viewsets.ModelViewSet):
     )
     def daily_meal_plan(self, request, day, *args, **kwargs):
         user = request.user
-        day = day or timezone.now().date()
+        try:
+            day = date.fromisoformat(day) if day else timezone.now().date()
+        except ValueError:
+            return CustomErrorResponse(message="Invalid date format. Use YYYY-MM-DD", status=400)
         try: 
             goal = CalorieQA.objects.get(user=user)
         except CalorieQA.DoesNotExist:
             return CustomErrorResponse(message="Calorie onboarding not done yet!", status=404)
 
-        meals = SuggestedMeal.objects.filter(calorie_goal=goal, date=day)
+        meals = SuggestedMeal.objects.filter(calorie_goal=goal, day=day)
         data = {
             "date": str(day),
             "daily_target": goal.daily_calorie_target,
@@ -208,13 +218,13 @@ class CalorieViewSet(viewsets.ModelViewSet):
             return CustomErrorResponse(message="Calorie onboarding not done yet!", status=404)
 
         suggested_meals = SuggestedMeal.objects.filter(
-            Q(calorie_goal=calorie) & (Q(date__date=day) | Q(is_template=True))
+            Q(calorie_goal=calorie) & (Q(day=day) | Q(is_template=True))
         ).order_by('-is_template', 'meal_type')
 
         if not suggested_meals.exists() or not suggested_meals.filter(is_template=False).exists():
             CalorieAIAssistant(user).generate_suggested_meals_for_the_day(calorie.id, day)
             suggested_meals = suggested_meals = SuggestedMeal.objects.filter(
-                Q(calorie_goal=calorie) & (Q(date__date=day) | Q(is_template=True))
+                Q(calorie_goal=calorie) & (Q(day=day) | Q(is_template=True))
             ).order_by('meal_type', '-is_template')
 
         serializer = SuggestedMealSerializer(suggested_meals, many=True)
@@ -262,28 +272,86 @@ class CalorieViewSet(viewsets.ModelViewSet):
         serializer_class=LoggedMealSerializer,
     )
     def log_meal(self, request, *args, **kwargs):
-        with transaction.atomic():
-            user = request.user
+        user = request.user
 
-            serializer = self.get_serializer(data=request.data)
-            if not serializer.is_valid():
-                return CustomErrorResponse(message=serializer.errors, status=400)
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomErrorResponse(message=serializer.errors, status=400)
 
-            calorie_goal = self.validate_and_get_calorie_profile(user)
-            if isinstance(calorie_goal, CustomErrorResponse):
-                return calorie_goal 
+        calorie_goal = self.validate_and_get_calorie_profile(user)
+        if isinstance(calorie_goal, CustomErrorResponse):
+            return calorie_goal 
 
-            validated_data = serializer.validated_data
-            nutrition = self.extract_nutrition_data(user, validated_data)
-            if not nutrition:
-                return CustomErrorResponse(message="Nutrition estimation failed", status=400)
+        validated_data = serializer.validated_data
+        if str(request.query_params.get("async", "")).lower() in ("1", "true", "yes"):
+            return self.log_meal_async(user, validated_data)
 
-            self.clean_validated_data_based_on_meal_source(validated_data, nutrition)
+        # The AI/barcode/vision call runs before any transaction is opened
+        nutrition = self.extract_nutrition_data(user, validated_data)
+        if not nutrition:
+            return CustomErrorResponse(message="Nutrition estimation failed", status=400)
+
+        self.clean_validated_data_based_on_meal_source(validated_data, nutrition)
 
+        with transaction.atomic():
             self.save_logged_meal(user, validated_data, nutrition)
             self.trigger_async_tasks(user, validated_data, nutrition)
 
-            return CustomSuccessResponse(message="Meal logged successfully!", status=200)
+        return CustomSuccessResponse(message="Meal logged successfully!", status=200)
+
+    def log_meal_async(self, user, validated_data):
+        """Saves a pending meal right away; complete_pending_logged_meal fills in the macros."""
+        source = validated_data["meal_source"]
+        placeholder = validated_data.get("food_item") or (
+            f"Barcode {validated_data.get('barcode')}" if source == MealSource.Barcode else "Scanned meal"
+        )
+        meal_date = validated_data.get("date") or timezone.now()
+        meal_data = {
+            "meal_source": source,
+            "food_item": validated_data.get("food_item"),
+            "barcode": validated_data.get("barcode"),
+            "image_url": validated_data.get("image_url"),
+            "number_of_servings_or_gram_or_slices": validated_data.get("number_of_servings_or_gram_or_slices", 1),
+            "measurement_unit": validated_data.get("measurement_unit", "grams"),
+            "quantity": validated_data.get("quantity", 1.0),
+        }
+
+        with transaction.atomic():
+            logged_meal = LoggedMeal.objects.create(
+                user=user,
+                meal_type=validated_data["meal_type"],
+                quantity=meal_data["quantity"],
+                date=meal_date,
+                food_item=placeholder[:100],
+                number_of_servings_or_gram_or_slices=meal_data["number_of_servings_or_gram_or_slices"] or 1,
+                measurement_unit=meal_data["measurement_unit"],
+                calories=0,
+                status="pending",
+            )
+            transaction.on_commit(lambda: complete_pending_logged_meal.delay(str(logged_meal.id), meal_data))
+
+        return CustomSuccessResponse(
+            message="Meal received, nutrition is being calculated.",
+            data={"id": str(logged_meal.id), "status": logged_meal.status},
+            status=202
+        )
+
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="log_meal_status/(?P<id>[^/.]+)",
+        permission_classes=[IsAuthenticated]
+    )
+    def log_meal_status(self, request, *args, **kwargs):
+        try:
+            meal = LoggedMeal.objects.get(user=request.user, id=kwargs['id'])
+        except (LoggedMeal.DoesNotExist, ValidationError):
+            return CustomErrorResponse(message="Resource not found!", status=404)
+
+        data = LoggedMealSerializer(meal).data
+        data["status"] = meal.status
+        data["failure_reason"] = meal.failure_reason
+        return CustomSuccessResponse(data=data, status=200)
 
     def validate_and_get_calorie_profile(self, user):
         if not hasattr(user, "calorie_qa"):
@@ -304,17 +372,11 @@ class CalorieViewSet(viewsets.ModelViewSet):
 
 
     def clean_validated_data_based_on_meal_source(self, validated_data, nutrition):
-        source = validated_data["meal_source"]
-        if source == MealSource.Barcode or source == MealSource.Scanned:
-            validated_data["food_item"] = nutrition.pop("food_name", validated_data.get("food_item"))
-        if source == MealSource.Scanned:
-            validated_data["number_of_servings_or_gram_or_slices"] = nutrition.pop("servings", validated_data.get("number_of_servings_or_gram_or_slices"))
-        if source == MealSource.Manual:
-            nutrition.pop("food_item", None)  # Avoid overwriting
+        CalorieAIAssistant.clean_meal_data_for_source(validated_data, nutrition)
 
 
     def save_logged_meal(self, user, validated_data, nutrition):
-        LoggedMeal.objects.create(
+        logged_meal = LoggedMeal.objects.create(
             user=user,
             meal_type=validated_data["meal_type"],
             quantity=validated_data.get('quantity', 1.0),
@@ -324,6 +386,8 @@ class CalorieViewSet(viewsets.ModelViewSet):
             measurement_unit=validated_data.get('measurement_unit', 'grams'),
             **nutrition
         )
+        rollup = refresh_daily_rollup(user.id, logged_meal.date)
+        transaction.on_commit(lambda: queue_health_insight_refresh(user.id, rollup.date))
 
 
     def trigger_async_tasks(self, user, validated_data, nutrition):
@@ -422,7 +486,7 @@ class CalorieViewSet(viewsets.ModelViewSet):
             
             if not worked_out_calories:
                 return CustomErrorResponse(message="Workout estimation failed", status=400)
-            LoggedWorkout.objects.update_or_create(
+            workout, _ = LoggedWorkout.objects.update_or_create(
                 user=user,
                 duration_minutes =validated_data['duration_minutes'],
                 estimated_calories_burned=worked_out_calories,
@@ -432,6 +496,7 @@ class CalorieViewSet(viewsets.ModelViewSet):
                     **validated_data,
                 }
             )
+            refresh_daily_rollup(user.id, workout.date)
             transaction.on_commit(lambda: update_user_calorie_streak.delay(user.id))
             return CustomSuccessResponse(message="Workout logged successfully!", status=200)
         
@@ -574,6 +639,8 @@ class CalorieViewSet(viewsets.ModelViewSet):
         except LoggedMeal.DoesNotExist:
             return CustomErrorResponse(message="Resource not found!")
         meal.delete()
+        rollup = refresh_daily_rollup(user.id, meal.date)
+        queue_health_insight_refresh(user.id, rollup.date)
         return CustomSuccessResponse(message="Meal deleted successfully", status=200)
     
     @action(
@@ -590,6 +657,7 @@ class CalorieViewSet(viewsets.ModelViewSet):
         except LoggedWorkout.DoesNotExist:
             return CustomErrorResponse(message="Resource not found!")
         meal.delete()
+        refresh_daily_rollup(user.id, meal.date)
         return CustomSuccessResponse(message="Workout deleted successfully", status=200)
 
 
@@ -635,7 +703,7 @@ class CalorieViewSet(viewsets.ModelViewSet):
         except ValueError:
             return CustomErrorResponse(message="Invalid date format. Use YYYY-MM-DD", status=400)
 
-        meals = LoggedMeal.objects.filter(user=user, date__date=day)
+        meals = LoggedMeal.objects.filter(user=user, day=day, status="completed")
 
         # Optional filters
         meal_type = request.query_params.get("meal_type")
@@ -733,7 +801,7 @@ class CalorieViewSet(viewsets.ModelViewSet):
     )
     def get_all_my_logged_meal(self, request, *args, **kwargs):
         user = request.user
-        meals = LoggedMeal.objects.filter(user=user).order_by('-created_at')
+        meals = LoggedMeal.objects.filter(user=user, status="completed").order_by('-created_at')
         filtered_queryset = self.filter_queryset(meals)
         page = self.paginate_queryset(filtered_queryset)
         if page is None:
@@ -856,18 +924,20 @@ class CalorieViewSet(viewsets.ModelViewSet):
         if not goal:
             return CustomErrorResponse(message="No goal specified", status=404)
 
-        suggested = SuggestedMeal.objects.filter(calorie_goal=goal, date=day)
-        logged = LoggedMeal.objects.filter(user=user, date=day)
+        try:
+            rollup = get_daily_rollup(user, day)
+        except ValueError:
+            return CustomErrorResponse(message="Invalid date format. Use YYYY-MM-DD", status=400)
 
-        def sum_by_meal(meals):
-            return {meal_type: sum(m.calories for m in meals if m.meal_type == meal_type)
+        def sum_by_meal(kind):
+            return {meal_type: (rollup.meal_type_totals(meal_type, kind) or {}).get("calories", 0)
                     for meal_type in ["breakfast", "lunch", "dinner"]}
 
         data ={
             "date": str(day),
             "target_total": goal.daily_calorie_target,
-            "suggested": sum_by_meal(suggested),
-            "logged": sum_by_meal(logged),
+            "suggested": sum_by_meal("suggested"),
+            "logged": sum_by_meal("logged"),
         }
 
         return CustomSuccessResponse(data=data, status=200)
@@ -892,7 +962,10 @@ class CalorieViewSet(viewsets.ModelViewSet):
     def compare_logged_vs_suggested(self, request, day, *args, **kwargs):
         user = request.user
         day = day or timezone.now().date()
-        data = CalorieAIAssistant(user=user).compare_logged_vs_suggested(day)
+        try:
+            data = CalorieAIAssistant(user=user).compare_logged_vs_suggested(day)
+        except ValueError:
+            return CustomErrorResponse(message="Invalid date format. Use YYYY-MM-DD", status=400)
         return CustomSuccessResponse(data=data, status=200)
     
     @extend_schema(
@@ -916,9 +989,12 @@ class CalorieViewSet(viewsets.ModelViewSet):
         user = request.user
         today = day or timezone.now().date()
         
-        meals = LoggedMeal.objects.filter(user=user, date=today)
+        try:
+            rollup = get_daily_rollup(user, today)
+        except ValueError:
+            return CustomErrorResponse(message="Invalid date format. Use YYYY-MM-DD", status=400)
 
-        total_calories = meals.aggregate(total=Coalesce(Sum('calories'), Value(0)))['total']
+        total_calories = rollup.calories
     
         try:
             calorie = CalorieQA.objects.get(user=user)
@@ -927,40 +1003,22 @@ class CalorieViewSet(viewsets.ModelViewSet):
         calorie_goal = calorie.daily_calorie_target
 
         # Calories by meal type
-        meal_breakdown = meals.values('meal_type').annotate(
-            total_kcal=Sum('calories')
-        )
+        meal_breakdown = [
+            (meal_type, totals["logged"]["calories"])
+            for meal_type, totals in rollup.by_meal_type.items() if totals.get("logged")
+        ]
         by_meal = [
             {
-                "label": m['meal_type'].capitalize(),
-                "percentage": round((m['total_kcal'] / calorie_goal) * 100, 1) if calorie_goal else 0,
-                "kcal": m['total_kcal']
+                "label": meal_type.capitalize(),
+                "percentage": round((total_kcal / calorie_goal) * 100, 1) if calorie_goal else 0,
+                "kcal": total_kcal
             }
-            for m in meal_breakdown
+            for meal_type, total_kcal in meal_breakdown
         ]
 
         # Macro-nutrients
-        macros = meals.aggregate(
-            protein=Coalesce(Sum('protein'), Value(0)),
-            fats=Coalesce(Sum('fats'), Value(0)),
-            carbs=Coalesce(Sum('carbs'), Value(0))
-        )
-        total_macros = macros['protein'] + macros['fats'] + macros['carbs']
-        macros_percent = {
-            "protein": {
-                "percentage": round((macros['protein'] / total_macros) * 100, 1) if total_macros else 0,
-                "grams": round(macros['protein'], 1)
-            },
-            "fat": {
-                "percentage": round((macros['fats'] / total_macros) * 100, 1) if total_macros else 0,
-                "grams": round(macros['fats'], 1)
-            },
-            "carbs": {
-                "percentage": round((macros['carbs'] / total_macros) * 100, 1) if total_macros else 0,
-                "grams": round(macros['carbs'], 1)
-            },
-        }
-        insight = CalorieAIAssistant(user).generate_health_insight(calorie_goal, total_calories, macros_percent, today)
+        macros_percent = rollup.macros_percent()
+        insight = CalorieAIAssistant(user).get_daily_health_insight(rollup, calorie_goal)
         cleaned_insight = clean_insight(insight)
         
         return CustomSuccessResponse(data={
@@ -997,24 +1055,17 @@ class CalorieViewSet(viewsets.ModelViewSet):
         user = request.user
         target_date = date.fromisoformat(day) if day else timezone.now().date()
 
-        suggested_meals = SuggestedMeal.objects.filter(calorie_goal__user=user, date__date=target_date)
-        logged_meals = LoggedMeal.objects.filter(user=user, date__date=target_date)
-
-        suggested_workout = SuggestedWorkout.objects.filter(calorie_goal__user=user, date__date=target_date).first()
-        logged_workouts = LoggedWorkout.objects.filter(user=user, date=target_date)
+        rollup = get_daily_rollup(user, target_date)
 
-        total_logged_meal_calories = logged_meals.aggregate(total=Sum('calories'))['total'] or 0
-        total_logged_burn = logged_workouts.aggregate(total=Sum('estimated_calories_burned'))['total'] or 0
+        total_logged_meal_calories = rollup.calories
+        total_logged_burn = rollup.calories_burned
+        total_suggested_meal_calories = rollup.suggested_calories
+        suggested_burn = rollup.suggested_calories_burned
 
         # Macro_nutrient totals from logged meals
-        macro_agg = logged_meals.aggregate(
-            protein=Sum('protein'),
-            fat=Sum('fats'),
-            carbs=Sum('carbs'),
-        )
-        total_protein = macro_agg['protein'] or 0
-        total_fat = macro_agg['fat'] or 0
-        total_carbs = macro_agg['carbs'] or 0
+        total_protein = rollup.protein
+        total_fat = rollup.fats
+        total_carbs = rollup.carbs
 
         # Macro_nutrient goals
         macros = user.calorie_qa.macro_nutrient_targets
@@ -1029,16 +1080,14 @@ class CalorieViewSet(viewsets.ModelViewSet):
                     "left": max(user.calorie_qa.daily_calorie_target - total_logged_meal_calories, 0)
                 },
                 "meals": {
-                    "suggested": suggested_meals.aggregate(total=Sum('calories'))['total'] or 0,
+                    "suggested": total_suggested_meal_calories,
                     "logged": total_logged_meal_calories,
-                    "difference": total_logged_meal_calories - (
-                        suggested_meals.aggregate(total=Sum('calories'))['total'] or 0
-                    )
+                    "difference": total_logged_meal_calories - total_suggested_meal_calories
                 },
                 "workout": {
-                    "suggested": suggested_workout.estimated_calories_burned if suggested_workout else 0,
+                    "suggested": suggested_burn,
                     "logged": total_logged_burn,
-                    "difference": total_logged_burn - (suggested_workout.estimated_calories_burned if suggested_workout else 0)
+                    "difference": total_logged_burn - suggested_burn
                 },
                 "macro_nutrients": {
                     "protein": {
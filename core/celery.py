@@ -20,7 +20,7 @@ app.conf.beat_schedule = {
     },
     'daily-wind-down-quote-task': {
         'task': 'mindspace.services.tasks.generate_daily_wind_down_quotes',
-        'schedule': crontab(minute=5),  # 00:05 every hour
+        'schedule': crontab(minute=5, hour='*/6'),  # 00:05 every 6 hours, pools are generated days ahead
     },
     'weekly-mood-insight-task': {
         'task': 'mindspace.services.tasks.generate_weekly_user_insights',
@@ -37,17 +37,19 @@ app.conf.beat_schedule = {
     
     
     # for reminder
-    "daily-user-meal-reminder": {
-        "task": "reminders.services.tasks.trigger_user_daily_meal_reminders",
-        "schedule": crontab(hour=9, minute=0),  # 9:00 AM every day
-    },
-    "periodic-user-meal-reminder": {
-        "task": "reminders.services.tasks.trigger_send_reminders_if_user_forgot_to_log_meal",
-        "schedule": crontab(minute=0, hour='17-21'),  # Every hour from 5 PM to 9 PM
-    },
-    "weekly-insights_reminder": {
-        "task": "reminders.services.tasks.trigger_weekly_insights_for_all_users",
-        "schedule": crontab(hour=10, minute=0, day_of_week='6'),  # Saturday (6) at 10:00 AM
+    # daily meal (9:00), forgot-to-log (17:00-21:00) and weekly insight (Sat 10:00)
+    # reminders fire at each user's local time, see reminders/services/scheduler.py
+    "local-reminder-scheduler": {
+        "task": "reminders.services.tasks.schedule_local_reminders",
+        "schedule": crontab(minute='*/15'),  # Every 15 minutes
+    },
+    "due-user-reminders": {
+        "task": "reminders.services.tasks.send_due_reminders",
+        "schedule": crontab(minute='*'),  # Every minute
+    },
+    "notification-outbox-drain": {
+        "task": "reminders.services.tasks.drain_notification_outbox",
+        "schedule": crontab(minute='*'),  # Every minute, picks up retries and expired claims
     },
 }
 
@@ -202,6 +202,9 @@ SPECTACULAR_SETTINGS = {
 }
 
 OPENAI_API_KEY = config("OPENAI_API_KEY")
+OPENAI_TIMEOUT = config("OPENAI_TIMEOUT", default=30, cast=float)  # seconds, per call
+OPENAI_MAX_CONNECTIONS = config("OPENAI_MAX_CONNECTIONS", default=20, cast=int)  # pooled per worker process
+OPENAI_MAX_CONCURRENCY = config("OPENAI_MAX_CONCURRENCY", default=8, cast=int)  # in-flight calls per worker process
 
 
 # Redis Configuration
@@ -221,6 +224,33 @@ CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_BROKER_URL = REDIS_URL
 CELERY_BROKER_POOL_LIMIT = 5
 
+# Queues, each with its own worker (see start_worker.sh):
+#   critical      - user-facing emails (OTP, sign up, reset); never waits behind anything slow
+#   default       - short DB/CPU work (streaks, rollups, barcode refresh); prefork
+#   ai            - OpenAI-bound tasks, mostly waiting on the network; threads pool
+#   notifications - reminder fan-outs and outbox drains (FCM/SMTP I/O); threads pool
+CELERY_TASK_DEFAULT_QUEUE = "default"
+# keys are registered task names (the `name=` given to the decorator, else module.function)
+CELERY_TASK_ROUTES = {
+    "send_sign_up_email": {"queue": "critical"},
+    "verify_account_email": {"queue": "critical"},
+    "send_otp": {"queue": "critical"},
+    "send_account_verification_email": {"queue": "critical"},
+    "send_reset_request_mail": {"queue": "critical"},
+    "calculate_cycle_state": {"queue": "ai"},
+    "mindspace.services.tasks.generate_weekly_user_insights": {"queue": "ai"},
+    "mindspace.services.tasks.generate_daily_wind_down_quotes": {"queue": "ai"},
+    "mindspace.services.tasks.complete_mood_title": {"queue": "ai"},
+    "generate_and_save_analysis": {"queue": "ai"},
+    "generate_user_report_and_save_analysis": {"queue": "ai"},
+    "trivia.services.tasks.run_daily_question_sync": {"queue": "ai"},
+    "get_suggested_meal_for_user": {"queue": "ai"},
+    "calories.services.tasks.generate_suggested_meals_for_goal": {"queue": "ai"},
+    "calories.services.tasks.complete_pending_logged_meal": {"queue": "ai"},
+    "calories.services.tasks.refresh_daily_health_insight": {"queue": "ai"},
+    "reminders.services.tasks.*": {"queue": "notifications"},
+}
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
@@ -270,6 +300,14 @@ FCM_DJANGO_SETTINGS = {
     "ONE_DEVICE_PER_USER": True,
     "DELETE_INACTIVE_DEVICES": False,
 }
+PUSH_MULTICAST_BATCH_SIZE = 500  # FCM's per-request token limit
+PUSH_DISPATCH_WORKERS = config("PUSH_DISPATCH_WORKERS", default=8, cast=int)  # concurrent multicast requests per task
+REMINDER_SHARD_COUNT = config("REMINDER_SHARD_COUNT", default=8, cast=int)  # user-id range tasks per local reminder slot
+REMINDER_SPREAD_SECONDS = config("REMINDER_SPREAD_SECONDS", default=600, cast=int)  # shards are staggered across this window
+NOTIFICATION_OUTBOX_DRAIN_WORKERS = config("NOTIFICATION_OUTBOX_DRAIN_WORKERS", default=4, cast=int)  # parallel outbox drain tasks per fan-out
+REMINDER_CATCH_UP_MINUTES = config("REMINDER_CATCH_UP_MINUTES", default=60, cast=int)  # missed minutes send_due_reminders back-fills
+NOTIFICATION_DIGEST_MAX_PER_WINDOW = config("NOTIFICATION_DIGEST_MAX_PER_WINDOW", default=3, cast=int)  # system pushes per user per window, 0 disables the digest
+NOTIFICATION_DIGEST_WINDOW_HOURS = config("NOTIFICATION_DIGEST_WINDOW_HOURS", default=24, cast=int)
 
 # CLOUDINARY
 API_KEY = config('API_KEY')
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mindspace', '0009_alter_moodmirrorentry_mood'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moodmirrorentry',
+            name='title_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=20),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mindspace', '0010_moodmirrorentry_title_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moodmirrorentry',
+            index=models.Index(fields=['mind_space', 'date'], name='moodentry_space_date_idx'),
+        ),
+    ]
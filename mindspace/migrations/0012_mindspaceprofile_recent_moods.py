@@ -0,0 +1,40 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:39
+
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+RECENT_MOODS_SIZE = 5
+
+
+def backfill_recent_moods(apps, schema_editor):
+    # one window query for every profile's latest entries, then batched updates
+    MindSpaceProfile = apps.get_model("mindspace", "MindSpaceProfile")
+    MoodMirrorEntry = apps.get_model("mindspace", "MoodMirrorEntry")
+    entries = MoodMirrorEntry.objects.annotate(
+        position=Window(RowNumber(), partition_by=[F("mind_space_id")], order_by=F("date").desc()),
+    ).filter(position__lte=RECENT_MOODS_SIZE).order_by("mind_space_id", "position").values_list(
+        "mind_space_id", "id", "mood", "date"
+    )
+    recent = {}
+    for profile_id, entry_id, mood, date in entries.iterator(chunk_size=2000):
+        recent.setdefault(profile_id, []).append({"id": str(entry_id), "mood": mood, "date": date.isoformat()})
+
+    profiles = [MindSpaceProfile(id=profile_id, recent_moods=moods) for profile_id, moods in recent.items()]
+    MindSpaceProfile.objects.bulk_update(profiles, ["recent_moods"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mindspace', '0011_moodmirrorentry_space_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mindspaceprofile',
+            name='recent_moods',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_recent_moods, migrations.RunPython.noop),
+    ]
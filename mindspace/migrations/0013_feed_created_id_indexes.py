@@ -0,0 +1,21 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mindspace', '0012_mindspaceprofile_recent_moods'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='soulreflection',
+            index=models.Index(fields=['created_at', 'id'], name='soulreflection_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='whisper',
+            index=models.Index(fields=['created_at', 'id'], name='whisper_feed_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.postgres.fields import ArrayField
 from accounts.models import User
 from common.models import BaseModel
@@ -11,21 +11,64 @@ class MindSpaceProfile(BaseModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="mind_space_profile")
     frequency_type = models.CharField(default=MindSpaceFrequencyType.Daily, choices=MindSpaceFrequencyType, max_length=50)
     goals = models.JSONField(default=list, blank=True) 
+    # newest-first [{"id", "mood", "date"}] of the last RECENT_MOODS_SIZE entries, kept on write
+    recent_moods = models.JSONField(default=list, blank=True, editable=False)
+
+    RECENT_MOODS_SIZE = 5
 
     def __str__(self):
         return f'{self.user.email} - Mind Space Profile'
 
+    @property
+    def last_mood(self):
+        return self.recent_moods[0]["mood"] if self.recent_moods else None
+
+    @staticmethod
+    def recent_mood_item(entry) -> dict:
+        return {"id": str(entry.id), "mood": entry.mood, "date": entry.date.isoformat()}
+
+    @classmethod
+    def push_recent_mood(cls, profile_id, entry):
+        """Adds a new entry to the profile's buffer; one locked read-modify-write, no entry query."""
+        with transaction.atomic():
+            profile = cls.objects.select_for_update().only("id", "recent_moods").get(pk=profile_id)
+            moods = [item for item in profile.recent_moods if item["id"] != str(entry.id)]
+            moods.append(cls.recent_mood_item(entry))
+            # entries can be back-dated, so the buffer is ordered by their date, not by arrival
+            moods.sort(key=lambda item: item["date"], reverse=True)
+            profile.recent_moods = moods[:cls.RECENT_MOODS_SIZE]
+            profile.save(update_fields=["recent_moods", "updated_at"])
+        return profile.recent_moods
+
+    @classmethod
+    def rebuild_recent_moods(cls, profile_id):
+        """Recomputes the buffer from the entries, after an edit or a delete."""
+        entries = MoodMirrorEntry.objects.filter(mind_space_id=profile_id).order_by("-date").only(
+            "id", "mood", "date"
+        )[:cls.RECENT_MOODS_SIZE]
+        recent_moods = [cls.recent_mood_item(entry) for entry in entries]
+        cls.objects.filter(pk=profile_id).update(recent_moods=recent_moods)
+        return recent_moods
+
     class Meta:
         verbose_name = "Mind Space"
         verbose_name_plural = "Mind Spaces"
 
         
+MOOD_TITLE_STATUSES = [
+    ("pending", "Pending"),  # placeholder title, the AI title is being generated
+    ("completed", "Completed"),
+    ("failed", "Failed"),  # generation failed, the placeholder stays
+]
+
+
 class MoodMirrorEntry(BaseModel):
     mind_space = models.ForeignKey(MindSpaceProfile, on_delete=models.CASCADE)
     mood = models.CharField(choices=MoodChoices, max_length=50)
     reflection = models.TextField(help_text="Reflect on your day.")
     title = models.CharField(max_length=255, blank=True, null=True,
                              help_text="Optional title for the entry.")
+    title_status = models.CharField(max_length=20, choices=MOOD_TITLE_STATUSES, default="completed")
     date = models.DateTimeField()
     affirmation = models.TextField(
         help_text="Optional affirmation for the entry.",
@@ -35,16 +78,17 @@ class MoodMirrorEntry(BaseModel):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["mind_space", "date"], name="moodentry_space_date_idx"),
+        ]
         
     @property
     def last_3_moods(self):
-        return (
-            MoodMirrorEntry.objects
-            .filter(mind_space=self.mind_space)
-            .exclude(id=self.id)
-            .order_by('-date')[:3]
-            .values_list('mood', flat=True)
-        )
+        # read from the profile's buffer: no query once `mind_space` is loaded (select_related it for lists)
+        return [
+            item["mood"] for item in self.mind_space.recent_moods
+            if item["id"] != str(self.id)
+        ][:3]
         
         
 class SoundscapeLibrary(models.Model):
@@ -118,6 +162,9 @@ class SoulReflection(BaseModel):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="soulreflection_feed_idx"),
+        ]
 
     def __str__(self):
         return f"Reflection from {self.city or 'Somewhere'}"
@@ -135,6 +182,12 @@ class Whisper(BaseModel):
     country = models.CharField(max_length=100, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
 
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="whisper_feed_idx"),
+        ]
+
     def __str__(self):
         return f"Whisper from {self.city or 'Unknown'}"
 
@@ -0,0 +1,118 @@
+import json
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+
+from utils.helpers.ai_service import OpenAIClient
+from utils.models import DailyWindDownQuote
+
+from ..choices import MoodChoices
+
+logger = logging.getLogger(__name__)
+
+QUOTE_POOL_DAYS = 3  # today plus the next two days are always generated ahead
+QUOTE_MAP_CACHE_TTL = 60 * 60 * 24 * (QUOTE_POOL_DAYS + 1)
+QUOTE_MAP_LOCAL_TTL = 60 * 10  # in-process copy, re-read from Redis after this
+QUOTE_FILL_LOCK_KEY = "wind_down_quotes:filling"
+QUOTE_FILL_LOCK_TTL = 60 * 30
+
+_local_maps = {}  # day -> (expires at, {mood: quotes})
+_local_lock = threading.Lock()
+
+
+def parse_quotes(response) -> list:
+    try:
+        quotes = json.loads(response) if isinstance(response, str) else response
+    except Exception:
+        quotes = [response]
+    return quotes if isinstance(quotes, list) else [quotes]
+
+
+class WindDownQuotePool:
+    """
+    Wind-down quotes generated ahead of time, QUOTE_POOL_DAYS at a time, and read back
+    as one mood -> quotes map per day: from process memory, then Redis, then one query.
+    Requests never reach the model.
+    """
+
+    @staticmethod
+    def cache_key(day) -> str:
+        return f"wind_down_quotes:{day.isoformat()}"
+
+    def quotes_for(self, mood, day=None):
+        return self.get_map(day or date.today()).get(mood)
+
+    def get_map(self, day) -> dict:
+        now = time.monotonic()
+        local = _local_maps.get(day)
+        if local and local[0] > now:
+            return local[1]
+
+        quote_map = cache.get(self.cache_key(day))
+        if quote_map is None:
+            quote_map = self.load_map(day)
+        self._keep_local(day, quote_map, now)
+        return quote_map
+
+    def load_map(self, day) -> dict:
+        quote_map = dict(DailyWindDownQuote.objects.filter(date=day).order_by("created_at").values_list("mood", "quotes"))
+        if quote_map:
+            # an empty map is not cached, so a day generated later is picked up
+            cache.set(self.cache_key(day), quote_map, QUOTE_MAP_CACHE_TTL)
+        return quote_map
+
+    @staticmethod
+    def _keep_local(day, quote_map, now):
+        with _local_lock:
+            for stale in [key for key, (expires_at, _) in _local_maps.items() if expires_at <= now]:
+                _local_maps.pop(stale, None)
+            if quote_map:
+                _local_maps[day] = (now + QUOTE_MAP_LOCAL_TTL, quote_map)
+
+    def fill(self, start=None, days: int = QUOTE_POOL_DAYS) -> int:
+        """
+        Generates the (day, mood) pools missing from the next `days` days, with the model
+        calls made concurrently, and refreshes the cached map of every day touched.
+        Overlapping runs (a beat double-fire, a manual run) return 0 instead of generating
+        and inserting the same pools twice.
+        """
+        if not cache.add(QUOTE_FILL_LOCK_KEY, "1", timeout=QUOTE_FILL_LOCK_TTL):
+            logger.info("Wind-down quote pools already being generated, skipping.")
+            return 0
+        try:
+            return self._fill(start or date.today(), days)
+        finally:
+            cache.delete(QUOTE_FILL_LOCK_KEY)
+
+    def _fill(self, start, days: int) -> int:
+        days_ahead = [start + timedelta(days=offset) for offset in range(days)]
+        existing = set(
+            DailyWindDownQuote.objects.filter(date__in=days_ahead).values_list("date", "mood")
+        )
+        missing = [
+            (day, mood, label)
+            for day in days_ahead
+            for mood, label in MoodChoices.choices
+            if (day, mood) not in existing
+        ]
+        if not missing:
+            return 0
+
+        from .tasks import MindSpaceAIAssistant
+
+        responses = OpenAIClient.generate_responses(
+            [MindSpaceAIAssistant.build_quotes_prompt(label) for _, _, label in missing]
+        )
+        records = [
+            DailyWindDownQuote(date=day, mood=mood, quotes=parse_quotes(response))
+            for (day, mood, _), response in zip(missing, responses)
+            if response
+        ]
+        DailyWindDownQuote.objects.bulk_create(records)
+        for day in {record.date for record in records}:
+            self.load_map(day)
+        logger.info(f"Generated {len(records)} of {len(missing)} missing wind-down quote pool(s)")
+        return len(records)
@@ -1,4 +1,7 @@
+import hashlib
 import json
+import logging
+import re
 from accounts.choices import Section
 from calories.serializers import MealSource
 from mindspace.services import soundscape_data
@@ -11,11 +14,33 @@ from utils.models import  DailyWindDownQuote, UserAIInsight
 from ..models import *
 from rest_framework import serializers
 from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 from django.utils.timezone import now
 from datetime import date
-from django.db.models import Sum
+from django.db.models import Exists, F, OuterRef, Subquery, Sum, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
 from core.celery import app as celery_app
 from celery import shared_task
+from django.core.cache import cache
+from reminders.services.outbox import NotificationOutboxWriter, push_entry
+from reminders.services.tasks import queue_outbox_drain
+from .quotes import WindDownQuotePool
+
+logger = logging.getLogger(__name__)
+
+# Affirmations only depend on the mood, so one answer per mood is shared for a few hours
+AFFIRMATION_CACHE_TTL = 60 * 60 * 6
+
+# Short reflections ("tired", "long day") repeat a lot; their titles are reused per mood
+MOOD_TITLE_MEMO_TTL = 60 * 60 * 24 * 7
+MOOD_TITLE_MEMO_MAX_WORDS = 8
+# an attached image waits here for the title task instead of riding in the broker message
+MOOD_TITLE_IMAGE_TTL = 60 * 30
+
+WEEKLY_INSIGHTS_LOCK_KEY = "mindspace:weekly_user_insights:running"
+WEEKLY_INSIGHTS_LOCK_TTL = 60 * 60
+# watermark for users with no insight yet: every entry counts as changed
+INSIGHT_WATERMARK_FLOOR = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
 
 @celery_app.task(name="create_sound_space_playlist")
 def create_sound_space_playlist(mind_space_id):
@@ -37,70 +62,170 @@ def create_sound_space_playlist(mind_space_id):
     
 @shared_task
 def generate_daily_wind_down_quotes():
-    from datetime import date
-
-    today = date.today()
-    moods = MoodChoices.choices
+    # keeps QUOTE_POOL_DAYS of pools ready; a run with nothing missing is one query
+    created = WindDownQuotePool().fill()
+    logger.info(f"Created {created} daily wind-down quote pool(s)")
 
-    for mood in moods:
-        if DailyWindDownQuote.objects.filter(date=today, mood=mood[0]).exists():
-            print(f"Daily wind-down quotes for {today} with mood {mood[0]} already exist.")
-            continue
 
-        assistant = MindSpaceAIAssistant()
-        quotes = assistant.get_random_quotes_for_user(current_mood=mood)
+def mood_title_image_key(entry_id) -> str:
+    return f"mindspace:mood_title_image:{entry_id}"
 
-        try:
-            quotes = json.loads(quotes) if isinstance(quotes, str) else quotes
-        except Exception:
-            quotes = [quotes]
 
-        DailyWindDownQuote.objects.create(date=today, mood=mood[0], quotes=quotes)
-        print(f"Created daily wind-down quotes for {today} with mood {mood[0]}")
+def stash_mood_title_image(entry_id, base_64_image):
+    cache.set(mood_title_image_key(entry_id), base_64_image, MOOD_TITLE_IMAGE_TTL)
 
 
 @shared_task
-def generate_weekly_user_insights():
-    today = date.today()
-    one_week_ago = today - timedelta(days=7)
+def complete_mood_title(entry_id, text=""):
+    """
+    Replaces the placeholder title of a freshly logged mood with the AI one. An attached
+    image is read from the cache (see stash_mood_title_image); if it expired, the title
+    is written from the mood and reflection alone.
+    """
+    try:
+        entry = MoodMirrorEntry.objects.select_related("mind_space__user").get(id=entry_id)
+    except MoodMirrorEntry.DoesNotExist:
+        logger.error(f"MoodMirrorEntry with ID {entry_id} does not exist.")
+        return
+    base_64_image = cache.get(mood_title_image_key(entry_id))
 
-    users = User.objects.filter(is_active=True, mind_space_profile__isnull=False)
-    insights_to_create = []
+    mind_space = entry.mind_space
+    try:
+        entry.title = MindSpaceAIAssistant(mind_space.user, mind_space).generate_mood_title_with_ai(
+            mood=entry.mood,
+            reflection=entry.reflection,
+            base_64_image=base_64_image,
+            text=text,
+        )[:255]
+        entry.title_status = "completed"
+    except Exception as e:
+        logger.error(f"Could not generate a title for mood entry {entry_id}: {e}")
+        entry.title_status = "failed"
+    entry.save(update_fields=["title", "title_status", "updated_at"])
+    if base_64_image:
+        cache.delete(mood_title_image_key(entry_id))
+
+    if entry.title_status == "completed":
+        notify_mood_title(mind_space.user, entry)
+
+
+def notify_mood_title(user, entry):
+    # through the outbox like every other push, so the digest budget applies to it too
+    if not user.allow_push_notifications or not user.device_token or user.device_token_dead_at:
+        return
+    outbox = NotificationOutboxWriter()
+    outbox.add(push_entry(user.id, f"mood_title:{entry.id}", timezone.now().date(), "Your mood entry", entry.title, "mood-mirror"))
+    outbox.close()
+    queue_outbox_drain(workers=1)
 
-    for user in users:
-        logs = MoodMirrorEntry.objects.filter(
-            mind_space__user=user,
-            date__date__range=(one_week_ago, today)
-        ).order_by("-created_at")[:4]
 
-        if not logs.exists():
-            continue
-        mood = logs.first().mood or "Unknown"
-        
-        if user.mood_insights.filter(date=today, insight_type=InsightType.Insight, context_tag=mood).exists():
-            print(f"Insights for user {user.email}, mood -{mood} already exist for today.")
-            continue
-        
-        try:
-            insights = MindSpaceAIAssistant(user).generate_insights(logs, count=4)
-            print(f"Generated insights for user {user.email}")
-            
+@shared_task
+def generate_weekly_user_insights():
+    # a run that outlasts the 15 minute beat interval must not get a second copy started on top of it
+    if not cache.add(WEEKLY_INSIGHTS_LOCK_KEY, "1", timeout=WEEKLY_INSIGHTS_LOCK_TTL):
+        logger.info("Weekly mood insights already running, skipping this tick.")
+        return
+    try:
+        created = WeeklyMoodInsightPipeline().run()
+        logger.info(f"Created {created} weekly mood insight(s)")
+    finally:
+        cache.delete(WEEKLY_INSIGHTS_LOCK_KEY)
+
+
+class WeeklyMoodInsightPipeline:
+    """
+    Weekly mood insights in three set-based steps instead of a query, an exists()
+    and a blocking model call per user:
+
+    1. users whose mood entries changed after their last insight (the watermark)
+       and who have no insight for today yet, in one query;
+    2. each chunk's last `logs_per_user` entries of the week in one window query;
+    3. the chunk's model calls fanned out with bounded concurrency, results bulk inserted.
+    """
+
+    def __init__(self, chunk_size: int = 200, logs_per_user: int = 4, concurrency: int = None):
+        self.chunk_size = chunk_size
+        self.logs_per_user = logs_per_user
+        self.concurrency = concurrency
+
+    def run(self, today=None) -> int:
+        today = today or date.today()
+        # [7 days ago 00:00, tomorrow 00:00) as a plain range, so (mind_space, date) stays usable
+        week = (
+            datetime.combine(today - timedelta(days=7), datetime.min.time(), tzinfo=dt_timezone.utc),
+            datetime.combine(today + timedelta(days=1), datetime.min.time(), tzinfo=dt_timezone.utc),
+        )
 
+        user_ids = list(self.pending_users(today, week).values_list("id", flat=True))
+        created = 0
+        for start in range(0, len(user_ids), self.chunk_size):
+            created += self.process(user_ids[start:start + self.chunk_size], today, week)
+        return created
+
+    @staticmethod
+    def pending_users(today, week):
+        last_insight_at = UserAIInsight.objects.filter(
+            user=OuterRef("pk"), insight_type=InsightType.Insight
+        ).order_by("-created_at").values("created_at")[:1]
+        changed_entries = MoodMirrorEntry.objects.filter(
+            mind_space__user=OuterRef("pk"),
+            date__gte=week[0],
+            date__lt=week[1],
+            updated_at__gt=Coalesce(OuterRef("last_insight_at"), Value(INSIGHT_WATERMARK_FLOOR)),
+        )
+        return User.objects.filter(
+            is_active=True, mind_space_profile__isnull=False
+        ).annotate(
+            last_insight_at=Subquery(last_insight_at)
+        ).filter(
+            Exists(changed_entries)
+        ).exclude(
+            Exists(UserAIInsight.objects.filter(user=OuterRef("pk"), date=today, insight_type=InsightType.Insight))
+        ).order_by()
+
+    def recent_logs(self, user_ids, week) -> dict:
+        """{user id: newest-first entries of the week}, at most `logs_per_user` each."""
+        entries = MoodMirrorEntry.objects.filter(
+            mind_space__user_id__in=user_ids, date__gte=week[0], date__lt=week[1]
+        ).annotate(
+            owner_id=F("mind_space__user_id"),
+            position=Window(RowNumber(), partition_by=[F("mind_space_id")], order_by=F("created_at").desc()),
+        ).filter(position__lte=self.logs_per_user).only("date", "mood", "reflection", "created_at", "mind_space_id")
+
+        logs = {}
+        for entry in entries:
+            logs.setdefault(entry.owner_id, []).append(entry)
+        for user_logs in logs.values():
+            user_logs.sort(key=lambda entry: entry.created_at, reverse=True)
+        return logs
+
+    def process(self, user_ids, today, week) -> int:
+        logs = self.recent_logs(user_ids, week)
+        if not logs:
+            return 0
+        owners = list(logs)
+        responses = OpenAIClient.generate_responses(
+            [MindSpaceAIAssistant.build_insights_prompt(logs[user_id], count=4) for user_id in owners],
+            concurrency=self.concurrency,
+        )
+
+        insights_to_create = []
+        for user_id, insights in zip(owners, responses):
+            if not insights:
+                logger.error(f"Error generating insights for user {user_id}")
+                continue
             insights_to_create.append(
                 UserAIInsight(
-                    user=user,
-                    context_tag=mood,
+                    user_id=user_id,
+                    context_tag=logs[user_id][0].mood or "Unknown",
                     date=today,
                     insight_type=InsightType.Insight,
                     insights=insights
                 )
             )
-        except Exception as e:
-            print(f"Error generating insights for user {user.email}: {e}")
-            continue
-
-    if insights_to_create:
         UserAIInsight.objects.bulk_create(insights_to_create, ignore_conflicts=True)
+        return len(insights_to_create)
+
 
 class MindSpaceAIAssistant:
     def __init__(self, user=None, mind_space_profile=None):
@@ -108,20 +233,8 @@ class MindSpaceAIAssistant:
         self.mind_space_profile = mind_space_profile
         
     def get_last_mood_for_user(self, profile:MindSpaceProfile):
-        try:
-            last_entry = (
-                MoodMirrorEntry.objects
-                .filter(mind_space=profile)
-                .order_by('-date')
-                .first()
-            )
-
-            if last_entry:
-                return last_entry.mood
-            return None
-
-        except MindSpaceProfile.DoesNotExist:
-            return None
+        # kept on the profile on every mood write, no entry query
+        return profile.last_mood if profile else None
 
         
     def build_mood_prompt(self, mood, reflection):
@@ -166,6 +279,13 @@ class MindSpaceAIAssistant:
         """
         if base_64_image:
             return self.generate_mood_title_with_base64(mood, reflection, base_64_image, text)
+
+        memo_key = self.mood_title_memo_key(mood, reflection)
+        if memo_key:
+            title = cache.get(memo_key)
+            if title:
+                return title
+
         prompt = self.build_mood_prompt(mood, reflection)
         
         response = OpenAIClient.generate_response(prompt)
@@ -175,7 +295,27 @@ class MindSpaceAIAssistant:
                 code=500
             )
         
+        if memo_key:
+            cache.set(memo_key, response, MOOD_TITLE_MEMO_TTL)
         return response
+
+    @staticmethod
+    def placeholder_mood_title(mood):
+        return f"Feeling {MoodChoices(mood).label.lower()}" if mood in MoodChoices.values else "My reflection"
+
+    @staticmethod
+    def mood_title_memo_key(mood, reflection):
+        """Cache key for a short text-only reflection, None when it is too long to be worth sharing."""
+        normalized = " ".join(re.sub(r"[^\w\s]", " ", (reflection or "").lower()).split())
+        if not normalized or len(normalized.split()) > MOOD_TITLE_MEMO_MAX_WORDS:
+            return None
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        return f"mood_title:{mood}:{digest}"
+
+    @staticmethod
+    def get_memoized_mood_title(mood, reflection):
+        memo_key = MindSpaceAIAssistant.mood_title_memo_key(mood, reflection)
+        return cache.get(memo_key) if memo_key else None
         
     def generate_insights(self, logs: list, count: int = 3) -> list:
         """
@@ -185,6 +325,18 @@ class MindSpaceAIAssistant:
         :param count: How many insights to generate (default: 3)
         :return: Respond ONLY with the quotes as a JSON list of strings. Do not add quotes, explanations, or any extra text.
         """
+        prompt = self.build_insights_prompt(logs, count)
+        response = OpenAIClient.generate_response_list(prompt)
+        if not response:
+            raise serializers.ValidationError(
+                {"message": "Failed to get a response from the AI service.", "status": "failed"},
+                code=500
+            )
+        
+        return response
+
+    @staticmethod
+    def build_insights_prompt(logs: list, count: int = 3) -> str:
         mood_history = "\n".join(
             [f"{log.date}: Mood - {log.mood}. Reflection: {log.reflection}" for log in logs]
         )
@@ -211,14 +363,7 @@ class MindSpaceAIAssistant:
             ...
             ]
             """
-        response = OpenAIClient.generate_response_list(prompt)
-        if not response:
-            raise serializers.ValidationError(
-                {"message": "Failed to get a response from the AI service.", "status": "failed"},
-                code=500
-            )
-        
-        return response
+        return prompt
 
 
     def generate_reflection_note(self, logs: list) -> str:
@@ -279,7 +424,11 @@ class MindSpaceAIAssistant:
         """
         prompt = self.get_affirmation_prompt(user_mood)
         
-        response = OpenAIClient.generate_response(prompt)
+        response = OpenAIClient.generate_response(
+            prompt,
+            cache_ttl=AFFIRMATION_CACHE_TTL,
+            cache_namespace="mindspace.affirmation",
+        )
         if not response:
             raise serializers.ValidationError(
                 {"message": "Failed to get a response from the AI service.", "status": "failed"},
@@ -300,6 +449,19 @@ class MindSpaceAIAssistant:
         return response
 
     def get_random_quotes_for_user(self, current_mood)-> list:
+        prompt = self.build_quotes_prompt(current_mood)
+        response = OpenAIClient.generate_response_list(prompt)
+        if not response:
+            raise serializers.ValidationError(
+                {"message": "Failed to get a response from the AI service.", "status": "failed"},
+                code=500
+            )
+        
+
+        return response
+
+    @staticmethod
+    def build_quotes_prompt(current_mood) -> str:
         prompt = f"""
             You are a motivational AI assistant.
             Generate 7-10 short, uplifting quotes that would inspire someone feeling {current_mood}.
@@ -326,13 +488,5 @@ class MindSpaceAIAssistant:
             ]
 
             """
-        response = OpenAIClient.generate_response_list(prompt)
-        if not response:
-            raise serializers.ValidationError(
-                {"message": "Failed to get a response from the AI service.", "status": "failed"},
-                code=500
-            )
-        
-
-        return response
+        return prompt
     
\ No newline at end of file
@@ -1,4 +1,4 @@
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 import json
 from rest_framework import viewsets, permissions
 from rest_framework.response import Response
@@ -8,13 +8,16 @@ from accounts.choices import Gender
 from django_filters.rest_framework import DjangoFilterBackend
 from mindspace.permissions import IsSuperAdmin
 from utils.models import DailyWindDownQuote, UserAIInsight
-from .services.tasks import MindSpaceAIAssistant, create_sound_space_playlist
+from .services.tasks import MindSpaceAIAssistant, complete_mood_title, create_sound_space_playlist, stash_mood_title_image
+from .services.quotes import WindDownQuotePool
 from .models import *
 from common.responses import CustomErrorResponse, CustomSuccessResponse
+from utils.pagination import KeysetCursorPagination
 from .serializers import *
 from django.utils import timezone
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.db import transaction
+from django.core.exceptions import ValidationError
 
 class MindSpaceViewSet(viewsets.ModelViewSet):
     queryset = MindSpaceProfile.objects.all()
@@ -148,7 +151,7 @@ class MoodMirrorEntryViewSet(viewsets.ModelViewSet):
         """
         return MoodMirrorEntry.objects.filter(
             mind_space__user=self.request.user
-        ).order_by('-created_at')
+        ).select_related('mind_space').order_by('-created_at')
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -164,6 +167,7 @@ class MoodMirrorEntryViewSet(viewsets.ModelViewSet):
                 message="Mind Space profile does not exist for this user. Set up mind space",
                 status=400)
         serializer.save(mind_space=user.mind_space_profile)
+        MindSpaceProfile.push_recent_mood(user.mind_space_profile.id, serializer.instance)
         return CustomSuccessResponse(
             message="Mood Mirror Entry created successfully.",
             data=serializer.data
@@ -182,10 +186,16 @@ class MoodMirrorEntryViewSet(viewsets.ModelViewSet):
             )
         validated_data = serializer.validated_data
         serializer.save(**validated_data)
+        if {"mood", "date"} & set(validated_data):
+            MindSpaceProfile.rebuild_recent_moods(instance.mind_space_id)
         return CustomSuccessResponse(
             message="Mood updated successfully.",
             data=serializer.data
         )
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        MindSpaceProfile.rebuild_recent_moods(instance.mind_space_id)
     
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
@@ -250,29 +260,58 @@ class MoodMirrorEntryViewSet(viewsets.ModelViewSet):
                 status=200
             )
         
-        title = MindSpaceAIAssistant(
-            user, user.mind_space_profile
-        ).generate_mood_title_with_ai(
-            mood=validated_data["mood"],
-            reflection=validated_data["reflection"],
-            base_64_image=validated_data.get("base_64_image"),
-            text=validated_data.get("text", "")
-        )
-        MoodMirrorEntry.objects.create(
+        # the AI title (a vision call when an image is attached) is generated off the
+        # request; the entry is saved now with a placeholder unless a memoized title exists
+        mood = validated_data["mood"]
+        reflection = validated_data["reflection"]
+        base_64_image = validated_data.get("base_64_image")
+        title = None if base_64_image else MindSpaceAIAssistant.get_memoized_mood_title(mood, reflection)
+
+        entry = MoodMirrorEntry.objects.create(
             mind_space=user.mind_space_profile,
-            mood=validated_data["mood"],
-            reflection=validated_data["reflection"],
-            title=title,
+            mood=mood,
+            reflection=reflection,
+            title=title or MindSpaceAIAssistant.placeholder_mood_title(mood),
+            title_status="completed" if title else "pending",
             date=validated_data.get("date", timezone.now())
         )
+        MindSpaceProfile.push_recent_mood(user.mind_space_profile.id, entry)
+        if not title:
+            if base_64_image:
+                # the task gets the entry id only, the image can be megabytes
+                stash_mood_title_image(entry.id, base_64_image)
+            transaction.on_commit(lambda: complete_mood_title.delay(str(entry.id), validated_data.get("text", "")))
+
         response = {
             "message": "Mood logged successfully",
-            "title": title,
-            "mood": validated_data["mood"],
-            "reflection": validated_data["reflection"]
+            "id": str(entry.id),
+            "title": entry.title,
+            "title_status": entry.title_status,
+            "mood": mood,
+            "reflection": reflection
         }
         
         return CustomSuccessResponse(data=response, message="Mood logged successfully")
+
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="mood_title/(?P<id>[^/.]+)",
+        permission_classes=[IsAuthenticated]
+    )
+    def mood_title(self, request, *args, **kwargs):
+        """Poll for the AI title of an entry logged with `log_mood`."""
+        try:
+            entry = MoodMirrorEntry.objects.only("id", "title", "title_status").get(
+                mind_space__user=request.user, id=kwargs["id"]
+            )
+        except (MoodMirrorEntry.DoesNotExist, ValidationError):
+            return CustomErrorResponse(message="Resource not found!", status=404)
+
+        return CustomSuccessResponse(
+            data={"id": str(entry.id), "title": entry.title, "title_status": entry.title_status},
+            status=200
+        )
     
     @action(
         methods=["get"],
@@ -688,33 +727,31 @@ class WindDownRitualLogViewSet(viewsets.ModelViewSet):
         Generate random quotes for the wind down ritual.
         """
         user = request.user
+        # the last mood comes from the profile's recent-moods buffer and the day's
+        # quote map from the cache, so no entry query is made
         mind_space_profile = getattr(user, 'mind_space_profile', None)
         if mind_space_profile is None:
             return CustomErrorResponse(message=f"{user} is yet to create a mind space.")
-        mood_entry = MoodMirrorEntry.objects.filter(
-            mind_space=mind_space_profile
-        ).order_by('-created_at').first()
-        mood = mood_entry.mood if mood_entry else "calm"
-        today = date.today()
-        print(today, mood)
-        try:
-            quote_record = DailyWindDownQuote.objects.get(date=today, mood=mood)
-            return CustomSuccessResponse(data=quote_record.quotes, message=f"{mood.capitalize()} quotes for today")
-        except DailyWindDownQuote.DoesNotExist:
+        mood = mind_space_profile.last_mood or "calm"
+
+        quotes = WindDownQuotePool().quotes_for(mood)
+        if quotes is None:
             return CustomErrorResponse(message="No quotes found for today's mood", status=404)
+        return CustomSuccessResponse(data=quotes, message=f"{mood.capitalize()} quotes for today")
         
     
 class SoulReflectionViewSet(viewsets.ModelViewSet):
     queryset = SoulReflection.objects.all().order_by('-created_at')
     serializer_class = SoulReflectionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
     
     def get_paginated_response(self, data):
         return Response({
             'status': 'success',
             'message': '',
             'data': {
-                'count': self.paginator.page.paginator.count,
+                'count': self.paginator.get_count(),
                 'next': self.paginator.get_next_link(),
                 'previous': self.paginator.get_previous_link(),
                 'results': data
@@ -902,13 +939,14 @@ class WhisperViewSet(viewsets.ModelViewSet):
     serializer_class = WhisperSerializer
     permission_classes = [IsAuthenticated] 
     DjangoFilterBackend = DjangoFilterBackend
+    pagination_class = KeysetCursorPagination
     
     def get_paginated_response(self, data):
         return Response({
             'status': 'success',
             'message': '',
             'data': {
-                'count': self.paginator.page.paginator.count,
+                'count': self.paginator.get_count(),
                 'next': self.paginator.get_next_link(),
                 'previous': self.paginator.get_previous_link(),
                 'results': data
@@ -934,20 +972,17 @@ class WhisperViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         filter_type = self.request.query_params.get('filter')
 
-        now = timezone.now()
+        # day boundaries as plain created_at ranges, so the (created_at, id) index is used
+        today = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
 
         if filter_type == "today":
-            return queryset.filter(created_at__date=now.date())
+            return queryset.filter(created_at__gte=today, created_at__lt=today + timedelta(days=1))
 
         if filter_type == "yesterday":
-            yesterday = now - timedelta(days=1)
-            return queryset.filter(
-                created_at__date=yesterday.date()
-            )
+            return queryset.filter(created_at__gte=today - timedelta(days=1), created_at__lt=today)
 
         if filter_type == "lastweek":
-            one_week_ago = now - timedelta(days=7)
-            return queryset.filter(created_at__date__gte=one_week_ago.date())
+            return queryset.filter(created_at__gte=today - timedelta(days=7))
 
         # Default to all-time
         return queryset
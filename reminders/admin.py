@@ -1,9 +1,16 @@
 from django.contrib import admin
-from .models import Reminder
+from .models import NotificationOutbox, Reminder
 
 @admin.register(Reminder)
 class ReminderAdmin(admin.ModelAdmin):
     list_display = ('user', 'type', 'time', 'enabled')
     list_filter = ('type', 'enabled')
     search_fields = ('user__email', 'message')
-    ordering = ('-time',)
\ No newline at end of file
+    ordering = ('-time',)
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('user', 'channel', 'kind', 'dedupe_date', 'status', 'attempts', 'sent_at')
+    list_filter = ('channel', 'status', 'kind')
+    search_fields = ('user__email', 'kind')
+    ordering = ('-created_at',)
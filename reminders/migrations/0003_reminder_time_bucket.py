@@ -0,0 +1,32 @@
+# Generated by Django 5.1.8 on 2026-10-18 01:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import ExtractHour, ExtractMinute
+
+
+def backfill_time_bucket(apps, schema_editor):
+    # one UPDATE; new rows get the bucket from Reminder.save()
+    Reminder = apps.get_model("reminders", "Reminder")
+    Reminder.objects.update(time_bucket=ExtractHour("time") * 60 + ExtractMinute("time"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reminders', '0002_notification_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='time_bucket',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_time_bucket, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['enabled', 'time_bucket'], name='reminder_enabled_bucket_idx'),
+        ),
+    ]
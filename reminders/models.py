@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from accounts.models import User
+from common.models import BaseModel
 
 class Reminder(models.Model):
     REMINDER_TYPE_CHOICES = [
@@ -15,6 +17,64 @@ class Reminder(models.Model):
     time = models.TimeField()
     message = models.TextField()
     enabled = models.BooleanField(default=True)
+    # minutes since midnight (UTC) of `time`, what the per-minute scan looks up
+    time_bucket = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["enabled", "time_bucket"], name="reminder_enabled_bucket_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.type} at {self.time}"
+
+    @staticmethod
+    def bucket_of(value) -> int:
+        return value.hour * 60 + value.minute
+
+    def save(self, *args, **kwargs):
+        self.time_bucket = self.bucket_of(self.time) if self.time is not None else None
+        super().save(*args, **kwargs)
+
+
+class NotificationOutbox(BaseModel):
+    """
+    One row per notification a user should get. (user, kind, dedupe_date) is unique,
+    so re-running a fan-out (task retry, beat double-fire) cannot queue a second copy;
+    workers claim rows with SELECT ... FOR UPDATE SKIP LOCKED and send them.
+    """
+    CHANNEL_CHOICES = [
+        ('push', 'Push'),
+        ('email', 'Email'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notification_outbox")
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, default='push')
+    kind = models.CharField(max_length=50)
+    dedupe_date = models.DateField()
+    # push: title/body/route; email: template/subject/context
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "kind", "dedupe_date"], name="outbox_user_kind_date_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="outbox_status_available_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.kind} on {self.dedupe_date} ({self.status})"
@@ -0,0 +1,90 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import NotificationOutbox
+from .outbox import kind_family
+
+logger = logging.getLogger(__name__)
+
+# reminders the user scheduled themselves always go out
+DIGEST_EXEMPT_KIND_PREFIXES = ("reminder:",)
+
+
+def digest_exempt(kind: str) -> bool:
+    return kind.startswith(DIGEST_EXEMPT_KIND_PREFIXES)
+
+
+class NotificationDigest:
+    """
+    Per-user push budget applied while the outbox drains. A user gets at most
+    `max_per_window` system pushes in the trailing window, and one push per kind
+    family per day: `forgot_to_log@17` ... `forgot_to_log@21` queued together go out
+    as one push carrying each distinct text, and a family already sent that day is
+    not sent again. Pushes another drainer has claimed count against the budget, so
+    concurrent drainers cannot go over it together. Held-back rows are recorded as
+    skipped, never re-queued.
+    """
+
+    def __init__(self, max_per_window: int = None, window_hours: int = None):
+        self.max_per_window = settings.NOTIFICATION_DIGEST_MAX_PER_WINDOW if max_per_window is None else max_per_window
+        self.window = timedelta(hours=settings.NOTIFICATION_DIGEST_WINDOW_HOURS if window_hours is None else window_hours)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_per_window > 0
+
+    def hold_back(self, entries) -> dict:
+        """
+        {entry id: ("skipped", reason)} for the claimed push rows over the user's budget
+        or merged into another row of the batch, whose payload body is rewritten in place.
+        """
+        candidates = [entry for entry in entries if entry.channel == "push" and not digest_exempt(entry.kind)]
+        if not self.enabled or not candidates:
+            return {}
+
+        now = timezone.now()
+        sent_count = defaultdict(int)
+        sent_families = defaultdict(set)  # user id -> {(family, date)}
+        history = NotificationOutbox.objects.filter(
+            Q(status="sent", sent_at__gte=now - self.window) | Q(status="sending", locked_until__gt=now),
+            user_id__in={entry.user_id for entry in candidates},
+            channel="push",
+        ).exclude(id__in=[entry.id for entry in entries]).values_list("user_id", "kind", "dedupe_date")
+        for user_id, kind, day in history:
+            if digest_exempt(kind):
+                continue
+            sent_count[user_id] += 1
+            sent_families[user_id].add((kind_family(kind), day))
+
+        groups = defaultdict(list)  # (user id, family, date) -> entries, oldest first
+        for entry in sorted(candidates, key=lambda entry: entry.available_at):
+            groups[(entry.user_id, kind_family(entry.kind), entry.dedupe_date)].append(entry)
+
+        held = {}
+        for (user_id, *family), group in groups.items():
+            family = tuple(family)  # (family, date)
+            first, rest = group[0], group[1:]
+            if family in sent_families[user_id]:
+                for entry in group:
+                    held[entry.id] = ("skipped", f"digest: {family[0]} already sent")
+                continue
+            if sent_count[user_id] >= self.max_per_window:
+                for entry in group:
+                    held[entry.id] = ("skipped", "digest: window budget used")
+                continue
+            sent_count[user_id] += 1
+            sent_families[user_id].add(family)
+            bodies = list(dict.fromkeys(entry.payload.get("body") for entry in group if entry.payload.get("body")))
+            if len(bodies) > 1:
+                first.payload = {**first.payload, "body": "\n".join(bodies)}
+            for entry in rest:
+                held[entry.id] = ("skipped", f"digest: merged into {first.kind}")
+
+        if held:
+            logger.info(f"Digest held back {len(held)} of {len(candidates)} push(es)")
+        return held
@@ -0,0 +1,219 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.helpers.push_dispatcher import DEAD_TOKEN_ERRORS, PushDispatcher
+from utils.helpers.services import send_template_email
+
+from ..models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_ENQUEUE_BATCH_SIZE = 2000
+OUTBOX_CLAIM_BATCH_SIZE = 500
+OUTBOX_LEASE = timedelta(minutes=10)  # a claimed row nobody finished is reclaimed after this
+OUTBOX_MAX_ATTEMPTS = 5
+
+
+def slot_kind(kind: str, slot) -> str:
+    """Kind for a notification that repeats within a day, e.g. one per hourly slot."""
+    return f"{kind}@{slot}"
+
+
+def kind_family(kind: str) -> str:
+    """`forgot_to_log@18` -> `forgot_to_log`; kinds without a slot are their own family."""
+    return kind.split("@", 1)[0]
+
+
+def push_entry(user_id, kind: str, day, title: str, body: str, route: str = None) -> NotificationOutbox:
+    return NotificationOutbox(
+        user_id=user_id, channel="push", kind=kind, dedupe_date=day,
+        payload={"title": title, "body": body, "route": route},
+    )
+
+
+def email_entry(user_id, kind: str, day, template: str, subject: str, **context) -> NotificationOutbox:
+    return NotificationOutbox(
+        user_id=user_id, channel="email", kind=kind, dedupe_date=day,
+        payload={"template": template, "subject": subject, "context": context},
+    )
+
+
+class NotificationOutboxWriter:
+    """
+    Buffers outbox rows and inserts them in batches; rows already queued for the same
+    (user, kind, date) are ignored, which is what makes a re-run fan-out harmless.
+
+        writer = NotificationOutboxWriter()
+        for user_id in user_ids:
+            writer.add(push_entry(user_id, "daily_meal", today, title, message))
+        writer.close()
+    """
+
+    def __init__(self, batch_size: int = OUTBOX_ENQUEUE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+
+    def add(self, entry: NotificationOutbox):
+        self.pending.append(entry)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        NotificationOutbox.objects.bulk_create(self.pending, ignore_conflicts=True)
+        self.written += len(self.pending)
+        self.pending = []
+
+    def close(self) -> int:
+        """Writes what is left and returns how many rows were offered (duplicates included)."""
+        self.flush()
+        return self.written
+
+
+class NotificationOutboxDrainer:
+    """
+    Claims due outbox rows in batches and sends them. The claim runs in its own short
+    transaction with SKIP LOCKED, so any number of workers can drain at once without
+    two of them picking the same row; the network calls happen after it commits.
+    A batch holds every due row of the users it claims; pushes over a user's digest
+    budget are merged or dropped before sending (see digest.py).
+    `kinds` limits a drainer to those rows, so an urgent email is not queued behind a fan-out.
+    """
+
+    def __init__(self, batch_size: int = OUTBOX_CLAIM_BATCH_SIZE, digest=None, kinds=None):
+        from .digest import NotificationDigest
+
+        self.batch_size = batch_size
+        self.digest = digest or NotificationDigest()
+        self.kinds = kinds
+
+    def claim(self) -> list:
+        now = timezone.now()
+        due = NotificationOutbox.objects.filter(
+            Q(status="pending", available_at__lte=now) | Q(status="sending", locked_until__lt=now)
+        )
+        if self.kinds is not None:
+            due = due.filter(kind__in=self.kinds)
+        with transaction.atomic():
+            # all of a user's due rows go to one batch, so the digest sees and merges them together
+            user_ids = set(due.order_by("available_at").values_list("user_id", flat=True)[:self.batch_size])
+            ids = list(
+                due.filter(user_id__in=user_ids).select_for_update(skip_locked=True).values_list("id", flat=True)
+            )
+            if not ids:
+                return []
+            NotificationOutbox.objects.filter(id__in=ids).update(
+                status="sending", locked_until=now + OUTBOX_LEASE, updated_at=now
+            )
+        return list(
+            # every field _record writes back is loaded here, or bulk_update would fetch each one per row
+            NotificationOutbox.objects.filter(id__in=ids).select_related("user").only(
+                "id", "channel", "kind", "dedupe_date", "payload", "attempts", "available_at",
+                "status", "locked_until", "sent_at", "last_error", "updated_at",
+                "user__id", "user__email", "user__device_type", "user__device_token",
+                "user__allow_push_notifications", "user__device_token_dead_at",
+            )
+        )
+
+    def drain(self, max_batches: int = None) -> dict:
+        """Sends claimed batches until nothing is due (or `max_batches` ran)."""
+        totals = {"sent": 0, "skipped": 0, "retry": 0, "failed": 0}
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            entries = self.claim()
+            if not entries:
+                break
+            batches += 1
+            for outcome, count in self.send(entries).items():
+                totals[outcome] += count
+        logger.info(f"Notification outbox drained {batches} batch(es): {totals}")
+        return totals
+
+    def send(self, entries) -> dict:
+        outcomes = self.digest.hold_back(entries)  # entry id -> (status, error)
+        # dispatch results only carry the token, so each round sends a token at most once:
+        # identical messages to one device collapse into one send, different ones go in later rounds
+        rounds = []  # [{token: (message, [entry ids])}]
+        for entry in entries:
+            if entry.id in outcomes:
+                continue
+            if entry.channel == "email":
+                outcomes[entry.id] = self._send_email(entry)
+                continue
+            user = entry.user
+            if not user.allow_push_notifications or not user.device_token or user.device_token_dead_at:
+                outcomes[entry.id] = ("skipped", "no usable device token")
+                continue
+            payload = entry.payload
+            message = (user.device_type, user.device_token, payload.get("title"), payload.get("body"), payload.get("route"))
+            for batch in rounds:
+                if batch.get(user.device_token, (message,))[0] == message:
+                    break
+            else:
+                batch = {}
+                rounds.append(batch)
+            batch.setdefault(user.device_token, (message, []))[1].append(entry.id)
+
+        for batch in rounds:
+            dispatcher = PushDispatcher()
+            for message, _ in batch.values():
+                dispatcher.add(*message)
+            results = {result.token: result for result in dispatcher.dispatch().results}
+            for token, (_, entry_ids) in batch.items():
+                outcome = self._push_outcome(results.get(token))
+                for entry_id in entry_ids:
+                    outcomes[entry_id] = outcome
+
+        return self._record(entries, outcomes)
+
+    @staticmethod
+    def _push_outcome(result):
+        if result is None:
+            return "skipped", "unsupported device type"
+        if result.success:
+            return "sent", ""
+        if result.error_code in DEAD_TOKEN_ERRORS:
+            return "failed", result.error_code
+        return "retry", result.error_code or ""
+
+    @staticmethod
+    def _send_email(entry):
+        payload = entry.payload
+        try:
+            send_template_email(payload["template"], entry.user.email, payload["subject"], **payload.get("context", {}))
+        except Exception as e:
+            return "retry", str(e)[:255]
+        return "sent", ""
+
+    @staticmethod
+    def _record(entries, outcomes) -> dict:
+        now = timezone.now()
+        counts = {"sent": 0, "skipped": 0, "retry": 0, "failed": 0}
+        updated = []
+        for entry in entries:
+            outcome, error = outcomes[entry.id]
+            entry.attempts += 1
+            entry.last_error = error
+            entry.locked_until = None
+            entry.updated_at = now
+            if outcome == "retry" and entry.attempts >= OUTBOX_MAX_ATTEMPTS:
+                outcome = "failed"
+            if outcome == "retry":
+                entry.status = "pending"
+                entry.available_at = now + timedelta(minutes=2 ** entry.attempts)
+            else:
+                entry.status = outcome
+                if outcome == "sent":
+                    entry.sent_at = now
+            counts[outcome] += 1
+            updated.append(entry)
+        NotificationOutbox.objects.bulk_update(
+            updated, ["status", "payload", "attempts", "last_error", "locked_until", "available_at", "sent_at", "updated_at"]
+        )
+        return counts
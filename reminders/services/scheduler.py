@@ -0,0 +1,138 @@
+import logging
+import uuid
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+import pytz
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from accounts.models import User
+
+logger = logging.getLogger(__name__)
+
+# local wall-clock slots each reminder kind goes out at; weekday follows date.weekday() (Saturday = 5)
+REMINDER_SLOTS = {
+    "daily_meal": {"hours": [9]},
+    "forgot_to_log": {"hours": [17, 18, 19, 20, 21]},
+    "weekly_insight": {"hours": [10], "weekday": 5},
+}
+
+# countries spanning several zones: the zone most of their population lives in
+PRIMARY_TIMEZONES = {
+    "CA": "America/Toronto",
+    "US": "America/New_York",
+    "AU": "Australia/Sydney",
+    "BR": "America/Sao_Paulo",
+    "MX": "America/Mexico_City",
+    "RU": "Europe/Moscow",
+    "ID": "Asia/Jakarta",
+    "CN": "Asia/Shanghai",
+    "KZ": "Asia/Almaty",
+    "AR": "America/Argentina/Buenos_Aires",
+}
+
+COUNTRY_ALIASES = {
+    "uk": "GB", "united kingdom": "GB", "england": "GB", "scotland": "GB", "wales": "GB",
+    "usa": "US", "united states of america": "US", "america": "US",
+    "uae": "AE", "south korea": "KR", "korea": "KR", "russia": "RU", "vietnam": "VN",
+}
+
+_COUNTRY_CODES = {name.lower(): code for code, name in pytz.country_names.items()}
+
+SCHEDULER_TICK_MINUTES = 15  # beat interval; every UTC offset is a multiple of 15 minutes
+
+
+@lru_cache(maxsize=512)
+def country_timezone(country: str):
+    """Best-guess zone for the free-text User.country; UTC when it can't be resolved."""
+    name = (country or "").strip().lower()
+    if not name:
+        return pytz.UTC
+    code = COUNTRY_ALIASES.get(name) or _COUNTRY_CODES.get(name) or (name.upper() if name.upper() in pytz.country_timezones else None)
+    if not code:
+        return pytz.UTC
+    return pytz.timezone(PRIMARY_TIMEZONES.get(code) or pytz.country_timezones[code][0])
+
+
+def local_day_bounds(tz, day):
+    """Aware [start, end) of the calendar `day` in `tz`, for filtering stored UTC timestamps."""
+    return (
+        tz.localize(datetime.combine(day, time.min)),
+        tz.localize(datetime.combine(day + timedelta(days=1), time.min)),
+    )
+
+
+def shard_bounds(shard: int, shard_count: int):
+    """Contiguous slice of the UUID space, so each shard is a primary key range scan."""
+    step = (1 << 128) // shard_count
+    lower = uuid.UUID(int=shard * step)
+    upper = None if shard == shard_count - 1 else uuid.UUID(int=(shard + 1) * step)
+    return lower, upper
+
+
+class ReminderScheduler:
+    """
+    Runs every SCHEDULER_TICK_MINUTES. Finds the countries whose local time has just
+    reached a reminder slot and enqueues one task per user-id shard for them, spread
+    over a window, instead of one task pushing to everyone at a fixed UTC hour.
+    """
+
+    def __init__(self, shard_count: int = None, window_seconds: int = None):
+        self.shard_count = shard_count or settings.REMINDER_SHARD_COUNT
+        self.window_seconds = settings.REMINDER_SPREAD_SECONDS if window_seconds is None else window_seconds
+
+    @staticmethod
+    def push_user_countries():
+        return set(
+            User.objects.filter(is_active=True, allow_push_notifications=True)
+            .order_by().values_list("country", flat=True).distinct()
+        )
+
+    def due_slots(self, at=None):
+        """{(kind, local_date, hour): [countries]} for every kind whose local slot starts this tick."""
+        at = (at or timezone.now()).astimezone(dt_timezone.utc)
+        due = {}
+        for country in self.push_user_countries():
+            local = at.astimezone(country_timezone(country))
+            if local.minute >= SCHEDULER_TICK_MINUTES:
+                continue
+            for kind, slot in REMINDER_SLOTS.items():
+                if local.hour not in slot["hours"]:
+                    continue
+                if "weekday" in slot and local.weekday() != slot["weekday"]:
+                    continue
+                due.setdefault((kind, local.date().isoformat(), local.hour), []).append(country or "")
+        return due
+
+    def schedule(self, at=None) -> int:
+        """Enqueues the shard tasks for this tick; returns how many were enqueued."""
+        from .tasks import send_local_reminder_shard
+
+        enqueued = 0
+        for (kind, local_date, hour), countries in self.due_slots(at).items():
+            # beat firing twice for the same tick must not double-send
+            countries = [
+                country for country in countries
+                if cache.add(f"reminder_slot:{kind}:{local_date}:{hour}:{country.lower()}", "1", timeout=60 * 60 * 2)
+            ]
+            if not countries:
+                continue
+            for shard in range(self.shard_count):
+                send_local_reminder_shard.apply_async(
+                    args=[kind, countries, local_date, shard, self.shard_count, hour],
+                    countdown=int(shard * self.window_seconds / self.shard_count),
+                )
+                enqueued += 1
+            logger.info(f"Scheduled {kind} for {len(countries)} countr(ies) at local {local_date} {hour}:00 in {self.shard_count} shard(s)")
+        return enqueued
+
+    @staticmethod
+    def shard_users(countries, shard: int, shard_count: int):
+        """Base user queryset for one shard of a slot; the reminder methods add their own filters."""
+        lower, upper = shard_bounds(shard, shard_count)
+        users = User.objects.filter(country__in=countries, id__gte=lower)
+        if upper is not None:
+            users = users.filter(id__lt=upper)
+        return users
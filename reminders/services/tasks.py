@@ -1,25 +1,34 @@
 from celery import shared_task
 from django.utils import timezone
 import logging
+import pytz
 from django.utils.timezone import now
 from calories.choices import ReminderChoices
 from calories.models import LoggedMeal
-from utils.helpers.fcm import PushNotificationService
+from utils.helpers.fcm import push_device
+from utils.helpers.push_dispatcher import DEAD_TOKEN_ERRORS, fcm_error_code, mark_tokens_dead
+from django.conf import settings
+from .digest import NotificationDigest
+from .outbox import NotificationOutboxDrainer, NotificationOutboxWriter, push_entry, slot_kind
+from .scheduler import local_day_bounds
 logger = logging.getLogger(__name__)
 from accounts.models import User
-from ..models import Reminder
-from django.db.models import Q
+from ..models import NotificationOutbox, Reminder
+from django.db.models import Exists, OuterRef, Q, Subquery, Sum
+
+# rows fetched per server-side cursor round trip
+REMINDER_STREAM_CHUNK_SIZE = 2000
 
 @shared_task
-def send_due_reminders():
-    now = timezone.now().time()
-    reminders = Reminder.objects.filter(time=now, enabled=True)
-    if reminders.count() == 0:
+def send_due_reminders(catch_up=True):
+    from .due_reminders import DueReminderEngine
+
+    queued = DueReminderEngine().run(catch_up=catch_up)
+    if queued == 0:
         logger.info("No reminders due at this time.")
-        return
-    for reminder in reminders:
-        # Trigger push/email/notification
-        logger.info(f"Send reminder to {reminder.user.email}: {reminder.message}")
+        return 0
+    queue_outbox_drain()
+    return queued
 
 @shared_task
 def generate_weekly_insights(user_id):
@@ -59,7 +68,12 @@ def generate_weekly_insights(user_id):
 
 def send_push_notification(title, message, device_type, registration_token, route: str = None):
     print('About to send reminder now')
-    PushNotificationService(device_type=device_type).send_push_notification(title=title, body=message, registration_token=registration_token)
+    try:
+        push_device(device_type).send_push_notification(title=title, body=message, registration_token=registration_token, route=route)
+    except Exception as e:
+        if fcm_error_code(e) in DEAD_TOKEN_ERRORS:
+            mark_tokens_dead([registration_token])
+        raise
 
 @shared_task
 def trigger_user_daily_meal_reminders():
@@ -79,112 +93,185 @@ def trigger_weekly_insights_for_all_users():
     logger.info(f"About to trigger_weekly_insights_for_all_users @ {now.date} ")
     Reminder().generate_weekly_insights_for_all_users()
 
+@shared_task
+def drain_notification_outbox(max_batches=None):
+    return NotificationOutboxDrainer().drain(max_batches=max_batches)
+
+def queue_outbox_drain(workers: int = None):
+    # each drain claims its own rows with SKIP LOCKED, so they never double-send
+    for _ in range(workers or settings.NOTIFICATION_OUTBOX_DRAIN_WORKERS):
+        drain_notification_outbox.delay()
+
+@shared_task
+def schedule_local_reminders():
+    from .scheduler import ReminderScheduler
+    enqueued = ReminderScheduler().schedule()
+    logger.info(f"Enqueued {enqueued} local reminder shard(s)")
+
+@shared_task
+def send_local_reminder_shard(kind, countries, local_date, shard, shard_count, hour=None):
+    from datetime import date
+    from .scheduler import ReminderScheduler, country_timezone
+
+    users = ReminderScheduler.shard_users(countries, shard, shard_count)
+    today = date.fromisoformat(local_date)
+    # countries share a slot only when their local hour starts in the same tick, so one zone fits them all
+    tz = country_timezone(countries[0]) if countries else None
+    logger.info(f"Sending {kind} shard {shard + 1}/{shard_count} for {countries} on {local_date}")
+    reminder = Reminder()
+    if kind == "daily_meal":
+        return reminder.send_daily_meal_reminders(users=users, today=today)
+    if kind == "forgot_to_log":
+        return reminder.send_reminders_if_user_forgot_to_log_meal(users=users, today=today, hour=hour, tz=tz)
+    if kind == "weekly_insight":
+        return reminder.generate_weekly_insights_for_all_users(users=users, today=today, tz=tz)
+    logger.error(f"Unknown reminder kind {kind}")
+
 class Reminder:
     def __init__(self, user: User=None):
         self.user = user
         
-    def generate_weekly_insights_for_all_users(self):
+    def generate_weekly_insights_for_all_users(self, users=None, today=None, tz=None):
         from datetime import timedelta
 
-        users = User.objects.filter(is_active=True, calorie_qa__isnull=False, allow_push_notifications=True)
+        today = today or timezone.now().date()
+        week_start, _ = local_day_bounds(tz or pytz.UTC, today - timedelta(days=7))
 
-        now = timezone.now()
-        week_ago = now - timedelta(days=7)
+        # one grouped sum per user, computed in the database and joined to the calorie
+        # profile; the target itself is a Python property, so it is derived per row below
+        weekly_calories = LoggedMeal.objects.filter(
+            user=OuterRef("pk"), date__gte=week_start, status="completed"
+        ).order_by().values("user").annotate(total=Sum("calories")).values("total")
 
-        for user in users:
-            logs = LoggedMeal.objects.filter(user=user, date__gte=week_ago)
+        users = (User.objects.all() if users is None else users).filter(
+            is_active=True, calorie_qa__isnull=False, allow_push_notifications=True,
+            device_token_dead_at__isnull=True
+        ).annotate(
+            week_total=Subquery(weekly_calories)
+        ).select_related("calorie_qa").only(
+            "id", "device_type", "device_token",
+            "calorie_qa__current_weight", "calorie_qa__goal_weight",
+            "calorie_qa__goal_timeline", "calorie_qa__activity_level",
+        ).order_by()
 
-            if not logs.exists():
+        title = "Your Weekly Wellness Insight 🧠"
+        outbox = NotificationOutboxWriter()
+        for user in users.iterator(chunk_size=REMINDER_STREAM_CHUNK_SIZE):
+            if user.week_total is None:
                 insight = "No meals logged this week. Try logging your meals daily for better insights."
-                average = total = 0
             else:
-                total = sum(log.calories for log in logs)
-                average = total / 7
+                average = user.week_total / 7
+                target = user.calorie_qa.daily_calorie_target
 
-                if not hasattr(user, "calorie_qa") or not user.calorie_qa.daily_calorie_target:
+                if not target:
                     insight = f"You logged meals but no target is set. Your average intake is {round(average)} cal/day."
+                elif average < target:
+                    insight = f"Great job! You stayed under your target this week. Avg: {round(average)} cal/day (target: {target})."
                 else:
-                    target = user.calorie_qa.daily_calorie_target
-                    if average < target:
-                        insight = f"Great job! You stayed under your target this week. Avg: {round(average)} cal/day (target: {target})."
-                    else:
-                        insight = f"You went over your target this week. Avg: {round(average)} cal/day (target: {target}). Let's improve next week!"
-        
-            # Optional: Notify user
-            send_push_notification(
-                title="Your Weekly Wellness Insight 🧠",
-                message=insight,
-                device_type=user.device_type,
-                registration_token = user.device_token
-            )
+                    insight = f"You went over your target this week. Avg: {round(average)} cal/day (target: {target}). Let's improve next week!"
+
+            outbox.add(push_entry(user.id, "weekly_insight", today, title, insight))
+
+        queued = outbox.close()
+        logger.info(f"Weekly insights: queued {queued}")
+        queue_outbox_drain()
+        return queued
 
         
     def trigger_reminders_for_user_to_log_meal(self):
         today = now().date()
+        day_start, day_end = local_day_bounds(pytz.UTC, today)
         users = User.objects.filter(
             is_active=True,
             calorie_qa__isnull=False,
-            allow_push_notifications=True
-        ).select_related("calorie_qa")
+            allow_push_notifications=True,
+            device_token_dead_at__isnull=True
+        ).annotate(
+            has_logged_today=Exists(LoggedMeal.objects.filter(
+                user=OuterRef("pk"), date__gte=day_start, date__lt=day_end, status="completed"
+            ))
+        ).order_by()
 
         title = "Calorie Reminder"
         daily_msg = "Time to log your meal on the Niigma app today!"
         forget_msg = "It's not too late! Log your meal on the Niigma app now."
         route = "meal-log"
 
-        for user in users:
-            reminder_type = user.calorie_qa.reminder
-            device_type = user.device_type
-            device_token = user.device_token
-            
+        outbox = NotificationOutboxWriter()
+        forget_kind = slot_kind("forgot_to_log", now().hour)
+        rows = users.values_list("calorie_qa__reminder", "id", "has_logged_today")
+        for reminder_type, user_id, has_logged_today in rows.iterator(chunk_size=REMINDER_STREAM_CHUNK_SIZE):
             if reminder_type == ReminderChoices.Daily or reminder_type == str(ReminderChoices.Daily).capitalize():
-                send_push_notification(title, daily_msg, device_type, device_token)
+                outbox.add(push_entry(user_id, "daily_meal", today, title, daily_msg))
             elif reminder_type == ReminderChoices.Only_If_I_Forget:
-                has_logged_today = LoggedMeal.objects.filter(
-                    user=user,
-                    date__date=today
-                ).exists()
                 if not has_logged_today:
-                    send_push_notification(title, forget_msg, device_type, device_token, route)
+                    outbox.add(push_entry(user_id, forget_kind, today, title, forget_msg, route))
+        queued = outbox.close()
+        queue_outbox_drain()
+        return queued
                 
-    def send_daily_meal_reminders(self):
-        users = User.objects.filter(
+    def send_daily_meal_reminders(self, users=None, today=None):
+        today = today or now().date()
+        users = (User.objects.all() if users is None else users).filter(
             is_active=True,
             calorie_qa__isnull=False,
-            allow_push_notifications=True
+            allow_push_notifications=True,
+            device_token_dead_at__isnull=True
         ).filter(
             Q(calorie_qa__reminder=ReminderChoices.Daily) |
             Q(calorie_qa__reminder=ReminderChoices.Daily.capitalize())
-        ).select_related("calorie_qa")
+        ).order_by()
 
         title = "Calorie Reminder"
         message = "Time to log your meal on the Niigma app today!"
         route = "meal-log"
         
-        for user in users:
-            send_push_notification(title, message, user.device_type, user.device_token, route)
+        outbox = NotificationOutboxWriter()
+        for user_id in users.values_list("id", flat=True).iterator(chunk_size=REMINDER_STREAM_CHUNK_SIZE):
+            outbox.add(push_entry(user_id, "daily_meal", today, title, message, route))
+        queued = outbox.close()
+        logger.info(f"Daily meal reminders: queued {queued}")
+        queue_outbox_drain()
+        return queued
             
-    def send_reminders_if_user_forgot_to_log_meal(self):
-        today = now().date()
+    def send_reminders_if_user_forgot_to_log_meal(self, users=None, today=None, hour=None, tz=None):
+        """`today` is the users' local date in `tz` (UTC by default); meals are matched on that local day."""
+        today = today or now().date()
+        # LoggedMeal.day is the UTC calendar day, so the local day is matched as a timestamp range
+        day_start, day_end = local_day_bounds(tz or pytz.UTC, today)
+        # sent once per slot: 17:00 and 18:00 are separate reminders, a re-run of 17:00 is not
+        kind = slot_kind("forgot_to_log", now().hour if hour is None else hour)
 
-        users = User.objects.filter(
+        # NOT EXISTS anti-join: only users with no meal today come back from the database
+        users = (User.objects.all() if users is None else users).filter(
             is_active=True,
             calorie_qa__isnull=False,
-            allow_push_notifications=True
+            allow_push_notifications=True,
+            device_token_dead_at__isnull=True
         ).filter(
             Q(calorie_qa__reminder=ReminderChoices.Only_If_I_Forget) |
             Q(calorie_qa__reminder=ReminderChoices.Only_If_I_Forget.capitalize())
-        ).select_related("calorie_qa")
+        ).filter(
+            ~Exists(LoggedMeal.objects.filter(
+                user=OuterRef("pk"), date__gte=day_start, date__lt=day_end, status="completed"
+            ))
+        ).order_by()
+        if NotificationDigest().enabled:
+            # the digest sends one forgot-to-log push a day, later slots would only be skipped
+            users = users.filter(~Exists(NotificationOutbox.objects.filter(
+                user=OuterRef("pk"), dedupe_date=today, kind__startswith=slot_kind("forgot_to_log", ""),
+                status__in=["pending", "sending", "sent"],
+            )))
 
         title = "Calorie Reminder"
         message = "It's not too late! Log your meal on the Niigma app now."
         route = "meal-log"
 
-        for user in users:
-            has_logged_today = LoggedMeal.objects.filter(
-                user=user,
-                date__date=today
-            ).exists()
-
-            if not has_logged_today:
-                send_push_notification(title, message, user.device_type, user.device_token, route)
\ No newline at end of file
+        outbox = NotificationOutboxWriter()
+        # server-side cursor, streamed straight into the outbox
+        for user_id in users.values_list("id", flat=True).iterator(chunk_size=REMINDER_STREAM_CHUNK_SIZE):
+            outbox.add(push_entry(user_id, kind, today, title, message, route))
+        queued = outbox.close()
+        logger.info(f"Forgot-to-log reminders: queued {queued}")
+        queue_outbox_drain()
+        return queued
\ No newline at end of file
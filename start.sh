@@ -1,8 +1,8 @@
 #!/usr/bin/env bash
 # start.sh
 
-# Start Celery in background
-celery -A core worker --loglevel=info --concurrency=5 --pool=prefork &
+# Start the Celery workers (one per queue) in background
+./start_worker.sh all &
 
 # echo "⏱️ Starting Celery Beat..."
 celery -A core beat --loglevel=info &
@@ -1,3 +1,4 @@
 #!/usr/bin/env bash
 echo "🚀 Starting Gunicorn..."
-exec gunicorn core.wsgi:application --bind 0.0.0.0:8000
+# Threaded workers so a request waiting on the AI gateway doesn't hold the whole worker
+exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 --worker-class gthread --threads ${GUNICORN_THREADS:-4}
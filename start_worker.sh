@@ -1,3 +1,44 @@
 #!/usr/bin/env bash
-echo "🚧 Starting Celery Worker..."
-exec celery -A core worker --loglevel=info --concurrency=6 --pool=prefork
+# Usage: ./start_worker.sh [critical|default|ai|notifications|all]   (default: all)
+#
+# One worker per queue (queues and routes are in core/settings.py), so a slow model
+# call can never hold up an OTP email. `all` runs every worker in this container
+# and exits when any of them does, letting the platform restart the service.
+#
+# Per-worker concurrency/prefetch come from the environment:
+#   CELERY_CRITICAL_CONCURRENCY       (default 2)
+#   CELERY_DEFAULT_CONCURRENCY        (default 4)
+#   CELERY_AI_CONCURRENCY             (default 16) threads, each mostly waiting on OpenAI
+#   CELERY_NOTIFICATIONS_CONCURRENCY  (default 8)  threads
+#   CELERY_NOTIFICATIONS_PREFETCH     (default 4)
+ROLE="${1:-all}"
+
+start_worker() {
+    local queue="$1" pool="$2" concurrency="$3" prefetch="$4"
+    echo "🚧 Starting Celery Worker for '${queue}' (${pool} x${concurrency}, prefetch ${prefetch})..."
+    celery -A core worker --loglevel=info \
+        -Q "${queue}" -n "${queue}@%h" \
+        --pool="${pool}" --concurrency="${concurrency}" --prefetch-multiplier="${prefetch}"
+}
+
+run_role() {
+    case "$1" in
+        # prefetch 1 on the latency sensitive and long-running queues: a worker only
+        # reserves a task when it has a free slot for it
+        critical)      start_worker critical prefork "${CELERY_CRITICAL_CONCURRENCY:-2}" 1 ;;
+        default)       start_worker default prefork "${CELERY_DEFAULT_CONCURRENCY:-4}" 1 ;;
+        ai)            start_worker ai threads "${CELERY_AI_CONCURRENCY:-16}" 1 ;;
+        notifications) start_worker notifications threads "${CELERY_NOTIFICATIONS_CONCURRENCY:-8}" "${CELERY_NOTIFICATIONS_PREFETCH:-4}" ;;
+        *) echo "Unknown worker role: $1" >&2; exit 1 ;;
+    esac
+}
+
+if [ "${ROLE}" = "all" ]; then
+    for queue in critical default ai notifications; do
+        run_role "${queue}" &
+    done
+    wait -n
+    exit $?
+fi
+
+run_role "${ROLE}"
@@ -7,6 +7,7 @@ from calories.models import LoggedMeal
 from mindspace.models import MoodMirrorEntry
 from ovulations.models import OvulationLog
 from symptoms.models import Symptom, SymptomAnalysis
+from utils.helpers.ai_cache import is_json
 from utils.helpers.ai_service import OpenAIClient
 from core.celery import app as celery_app
 from django.utils import timezone
@@ -15,6 +16,9 @@ from celery.utils.log import get_task_logger
 import logging
 logger = get_task_logger(__name__)
 
+# Symptoms-by-body-part answers only depend on the body part(s), so they are shared across users
+BODY_PART_SYMPTOMS_CACHE_TTL = 60 * 60 * 24 * 7
+
 @celery_app.task(name="generate_and_save_analysis")
 def generate_and_save_analysis(symptom_id):
     try:
@@ -63,7 +67,7 @@ class SymptomPromptBuilder:
         prompt = f"""
         You are a helpful, medically aware assistant.
 
-        A user is describing discomfort in their "{body_part}".
+        A user is describing discomfort in their "{str(body_part).strip()}".
 
         Return a list of common symptoms typically associated with this body part.
 
@@ -73,7 +77,12 @@ class SymptomPromptBuilder:
         Do not include any explanations or extra text.
         """
         
-        response = OpenAIClient.generate_response_list(prompt)
+        response = OpenAIClient.generate_response_list(
+            prompt,
+            cache_ttl=BODY_PART_SYMPTOMS_CACHE_TTL,
+            cache_namespace="symptoms.body_part",
+            cache_validator=is_json,
+        )
         if not response:
             raise serializers.ValidationError(
                 {"message": "Failed to get a response from the AI service.", "status": "failed"},
@@ -87,7 +96,9 @@ class SymptomPromptBuilder:
         """
         Generate a prompt to ask the AI for symptoms grouped by a list of body parts.
         """
-        formatted_parts = ", ".join([f'"{part}"' for part in body_parts])
+        # Sorted and de-duplicated so the same selection always builds the same (cacheable) prompt
+        unique_parts = sorted({str(part).strip() for part in body_parts}, key=str.casefold)
+        formatted_parts = ", ".join([f'"{part}"' for part in unique_parts])
         prompt = f"""
         You are a medically informed assistant.
 
@@ -106,7 +117,12 @@ class SymptomPromptBuilder:
         Do not include explanations or extra information. Only return the dictionary.
         """
         
-        response = OpenAIClient.generate_response_list(prompt.strip())
+        response = OpenAIClient.generate_response_list(
+            prompt.strip(),
+            cache_ttl=BODY_PART_SYMPTOMS_CACHE_TTL,
+            cache_namespace="symptoms.multiple_body_parts",
+            cache_validator=is_json,
+        )
         if not response:
             raise serializers.ValidationError(
                 {"message": "Failed to get a response from the AI service.", "status": "failed"},
@@ -219,7 +235,7 @@ class SymptomPromptBuilder:
 
         # MEALS
         recent_meals = LoggedMeal.objects.filter(
-            user=user, date__gte=today - timedelta(days=7)
+            user=user, date__gte=today - timedelta(days=7), status="completed"
         ).order_by("-date")[:3]
 
         meal_summary = (
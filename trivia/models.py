@@ -31,6 +31,7 @@ class TriviaProfile(BaseModel):
     def has_logged_calories_today(self):
         return LoggedMeal.objects.filter(
             user=self.user,
+            status="completed",
             created_at__date=timezone.now().date()
         ).only("id").exists()
 
@@ -10,6 +10,9 @@ from django.db.models import Sum
 from core.celery import app as celery_app
 from celery import shared_task
 
+# The shared daily set isn't personalised, so repeated syncs on the same day reuse one answer
+DAILY_TRIVIA_CACHE_TTL = 60 * 60 * 12
+
 
 @shared_task
 def run_daily_question_sync():
@@ -70,11 +73,17 @@ class TriviaAIAssistant:
     def generate_questions_ai(self, num_questions=3):
         prompt = self.generate_feature_trivia_prompt(self.user.full_name if self.user is not None else '', num_questions)
         
-        raw_response = OpenAIClient.generate_response_list(prompt)
+        # Premium sessions must get fresh questions every time, only the shared set is cached
+        raw_response = OpenAIClient.generate_response_list(
+            prompt,
+            cache_ttl=DAILY_TRIVIA_CACHE_TTL if self.user is None else None,
+            cache_namespace=f"trivia.daily_questions.{date.today().isoformat()}",
+            cache_validator=self.is_valid_questions_response,
+        )
         if not raw_response:
             logger.warning("🟡 AI returned an empty response.")
             return []
-        raw_response_cleaned = re.sub(r"(^```(?:\w+)?\n)|(\n```$)", "", raw_response.strip())
+        raw_response_cleaned = self.clean_response(raw_response)
 
         try:
             parsed = json.loads(raw_response_cleaned)
@@ -87,6 +96,17 @@ class TriviaAIAssistant:
             logger.warning(f"Raw response: {raw_response_cleaned}")
             return []
         
+    @staticmethod
+    def clean_response(raw_response: str) -> str:
+        return re.sub(r"(^```(?:\w+)?\n)|(\n```$)", "", raw_response.strip())
+
+    @classmethod
+    def is_valid_questions_response(cls, raw_response: str) -> bool:
+        try:
+            return isinstance(json.loads(cls.clean_response(raw_response)), list)
+        except (TypeError, ValueError):
+            return False
+        
     def generate_feature_trivia_prompt(self, user_first_name: str = "User", num_questions=3) -> str:
         return f"""
             You are a smart health and wellness trivia assistant for a mobile app called Niigma.
@@ -0,0 +1,23 @@
+from fnmatch import fnmatchcase
+
+from django.conf import settings
+from django.core.checks import Error, register
+from django.utils.module_loading import autodiscover_modules
+
+
+@register()
+def check_celery_task_routes(app_configs, **kwargs):
+    """Every CELERY_TASK_ROUTES key must match a registered task, or the task silently lands on `default`."""
+    from core.celery import app as celery_app
+
+    autodiscover_modules("services.tasks")  # where every app keeps its tasks
+    task_names = list(celery_app.tasks)
+    errors = []
+    for route in getattr(settings, "CELERY_TASK_ROUTES", {}):
+        if not any(fnmatchcase(name, route) for name in task_names):
+            errors.append(Error(
+                f"CELERY_TASK_ROUTES entry '{route}' does not match any registered Celery task.",
+                hint="Route tasks by their registered name, i.e. the `name=` passed to the task decorator.",
+                id="utils.E001",
+            ))
+    return errors
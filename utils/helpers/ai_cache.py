@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """Collapse the indentation/newlines of our f-string prompts; case is kept, it can change the answer."""
+    return _WHITESPACE_RE.sub(" ", str(text)).strip()
+
+
+def _normalize_content(content):
+    if isinstance(content, str):
+        return normalize_prompt(content)
+    if isinstance(content, list):
+        return [_normalize_content(part) for part in content]
+    if isinstance(content, dict):
+        return {key: _normalize_content(value) for key, value in sorted(content.items())}
+    return content
+
+
+class AIResponseCache:
+    """
+    Content-addressed cache for deterministic LLM prompts, stored in CACHES['default'].
+
+    Keys are a hash of the model, the normalized messages and the sampling parameters,
+    so two call sites sending the same prompt share one entry. Only one worker computes
+    a missing entry at a time; the others wait for it instead of all calling the model.
+    """
+
+    key_prefix = "ai_cache"
+
+    def __init__(self, lock_timeout: int = 60, poll_interval: float = 0.25):
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+
+    def make_key(self, namespace: str, model: str, messages: list, **params) -> str:
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": [
+                    {"role": message["role"], "content": _normalize_content(message["content"])}
+                    for message in messages
+                ],
+                "params": params,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{namespace}:{digest}"
+
+    def _count(self, namespace: str, outcome: str):
+        counter_key = f"{self.key_prefix}:stats:{namespace}:{outcome}"
+        try:
+            cache.add(counter_key, 0, timeout=None)
+            cache.incr(counter_key)
+        except Exception as e:
+            logger.debug(f"AI cache counter update failed for {counter_key}: {e}")
+
+    def stats(self, namespace: str) -> dict:
+        keys = {outcome: f"{self.key_prefix}:stats:{namespace}:{outcome}" for outcome in ("hit", "miss")}
+        values = cache.get_many(list(keys.values()))
+        return {outcome: values.get(key, 0) for outcome, key in keys.items()}
+
+    def _safe_get(self, key):
+        try:
+            return cache.get(key)
+        except Exception as e:
+            logger.warning(f"AI cache read failed for {key}: {e}")
+            return None
+
+    def _store(self, key, value, ttl, validator):
+        if value is None or (validator is not None and not validator(value)):
+            return
+        try:
+            cache.set(key, value, ttl)
+        except Exception as e:
+            logger.warning(f"AI cache write failed for {key}: {e}")
+
+    def get_or_compute(self, key: str, namespace: str, ttl: int, compute, validator=None):
+        """
+        Returns the cached value for `key` or computes, stores and returns it.
+
+        :param validator: optional callable; responses it rejects (e.g. invalid JSON) are not cached
+        """
+        value = self._safe_get(key)
+        if value is not None:
+            self._count(namespace, "hit")
+            return value
+
+        lock_key = f"{key}:lock"
+        try:
+            acquired = cache.add(lock_key, "1", timeout=self.lock_timeout)
+        except Exception:
+            acquired = True  # cache unavailable, just call the model
+
+        if not acquired:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                value = self._safe_get(key)
+                if value is not None:
+                    self._count(namespace, "hit")
+                    return value
+                try:
+                    if cache.get(lock_key) is None:
+                        break  # the other worker failed, compute it ourselves
+                except Exception:
+                    break
+
+        self._count(namespace, "miss")
+        try:
+            value = compute()
+            self._store(key, value, ttl, validator)
+            return value
+        finally:
+            if acquired:
+                try:
+                    cache.delete(lock_key)
+                except Exception:
+                    pass
+
+    async def _asafe_get(self, key):
+        try:
+            return await cache.aget(key)
+        except Exception as e:
+            logger.warning(f"AI cache read failed for {key}: {e}")
+            return None
+
+    async def aget_or_compute(self, key: str, namespace: str, ttl: int, compute, validator=None):
+        """Asyncio variant of `get_or_compute`, with the same lock; `compute` must be a coroutine function."""
+        value = await self._asafe_get(key)
+        if value is not None:
+            self._count(namespace, "hit")
+            return value
+
+        lock_key = f"{key}:lock"
+        try:
+            acquired = await cache.aadd(lock_key, "1", timeout=self.lock_timeout)
+        except Exception:
+            acquired = True  # cache unavailable, just call the model
+
+        if not acquired:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                value = await self._asafe_get(key)
+                if value is not None:
+                    self._count(namespace, "hit")
+                    return value
+                try:
+                    if await cache.aget(lock_key) is None:
+                        break  # the other worker failed, compute it ourselves
+                except Exception:
+                    break
+
+        self._count(namespace, "miss")
+        try:
+            value = await compute()
+            self._store(key, value, ttl, validator)
+            return value
+        finally:
+            if acquired:
+                try:
+                    await cache.adelete(lock_key)
+                except Exception:
+                    pass
+
+
+ai_response_cache = AIResponseCache()
+
+
+def is_json(response: str) -> bool:
+    try:
+        json.loads(response)
+        return True
+    except (TypeError, ValueError):
+        return False
@@ -1,58 +1,287 @@
-from openai import OpenAI
+import asyncio
+import json
+import logging
+import os
+import threading
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 from rest_framework import serializers
 from django.conf import settings
-import json
 from rest_framework.exceptions import APIException
 
+from utils.helpers.ai_cache import ai_response_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4"
+VISION_MODEL = "gpt-4o"
+WELLNESS_SYSTEM_PROMPT = "You are a helpful wellness assistant."
+
+
 class VerificationFailed(APIException):
     status_code = 400
     default_detail = "Invalid or expired verification code"
     default_code = "verification_failed"
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+class AIServiceBusy(APIException):
+    status_code = 503
+    default_detail = "The Niigma AI service is busy, please try again shortly."
+    default_code = "ai_service_busy"
+
+
+class AIGateway:
+    """
+    Single entry point for every LLM call made by the app.
+
+    One pooled sync client and one pooled async client are kept per worker process;
+    the async one lives on a background event loop that every async call runs on, so
+    its connections are reused across batches. The number of in-flight requests is
+    capped so a burst of slow completions can't eat every connection or thread in the worker.
+    """
+
+    def __init__(self, api_key, timeout=30.0, max_connections=20, max_concurrency=8):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._slots = None
+        self._loop = None
+        self._async_state = None
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+
+    def _ensure_process_state(self):
+        # Sockets and locks must not be shared across a prefork/gunicorn fork.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._client = OpenAI(
+                api_key=self.api_key,
+                timeout=self.timeout,
+                http_client=DefaultHttpxClient(limits=self._limits(), timeout=self.timeout),
+            )
+            self._slots = threading.BoundedSemaphore(self.max_concurrency)
+            # the loop thread does not survive a fork, the child starts its own
+            self._loop = None
+            self._async_state = None
+            self._pid = pid
+
+    @property
+    def client(self) -> OpenAI:
+        self._ensure_process_state()
+        return self._client
+
+    def _get_loop(self):
+        """The process's long-lived event loop, started on first use in a daemon thread."""
+        self._ensure_process_state()
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ai-gateway-loop", daemon=True).start()
+                self._async_state = {
+                    "client": AsyncOpenAI(
+                        api_key=self.api_key,
+                        timeout=self.timeout,
+                        http_client=DefaultAsyncHttpxClient(limits=self._limits(), timeout=self.timeout),
+                    ),
+                    "slots": asyncio.Semaphore(self.max_concurrency),
+                }
+                self._loop = loop
+        return self._loop
+
+    @staticmethod
+    def build_messages(prompt: str, system_prompt: str = None) -> list:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _request_kwargs(self, messages, model, temperature, max_tokens, timeout):
+        kwargs = {
+            "model": model,
+            "messages": messages,
+            "timeout": timeout or self.timeout,
+        }
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        return kwargs
+
+    def complete(self, messages: list, model: str = DEFAULT_MODEL, temperature: float = 0.7,
+                 max_tokens: int = None, timeout: float = None, cache_ttl: int = None,
+                 cache_namespace: str = "default", cache_validator=None) -> str:
+        """
+        Blocking chat completion, returns the first choice's content.
+
+        Pass `cache_ttl` (seconds) for prompts built only from small, discrete inputs;
+        identical requests are then answered from the shared response cache.
+        """
+        if cache_ttl:
+            key = ai_response_cache.make_key(
+                cache_namespace, model, messages, temperature=temperature, max_tokens=max_tokens
+            )
+            return ai_response_cache.get_or_compute(
+                key, cache_namespace, cache_ttl,
+                lambda: self.complete(messages, model, temperature, max_tokens, timeout),
+                validator=cache_validator,
+            )
+
+        kwargs = self._request_kwargs(messages, model, temperature, max_tokens, timeout)
+        client = self.client
+        if not self._slots.acquire(timeout=kwargs["timeout"]):
+            logger.warning("AI gateway saturated, rejecting %s request", model)
+            raise AIServiceBusy()
+        try:
+            response = client.chat.completions.create(**kwargs)
+        finally:
+            self._slots.release()
+        return response.choices[0].message.content
+
+    async def acomplete(self, messages: list, model: str = DEFAULT_MODEL, temperature: float = 0.7,
+                        max_tokens: int = None, timeout: float = None, cache_ttl: int = None,
+                        cache_namespace: str = "default", cache_validator=None) -> str:
+        """Asyncio chat completion, returns the first choice's content."""
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is not loop:
+            # the pooled async client belongs to the gateway loop, so run there
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+                self.acomplete(messages, model, temperature, max_tokens, timeout,
+                               cache_ttl, cache_namespace, cache_validator),
+                loop,
+            ))
+
+        if cache_ttl:
+            key = ai_response_cache.make_key(
+                cache_namespace, model, messages, temperature=temperature, max_tokens=max_tokens
+            )
+            return await ai_response_cache.aget_or_compute(
+                key, cache_namespace, cache_ttl,
+                lambda: self.acomplete(messages, model, temperature, max_tokens, timeout),
+                validator=cache_validator,
+            )
+
+        kwargs = self._request_kwargs(messages, model, temperature, max_tokens, timeout)
+        state = self._async_state
+        try:
+            await asyncio.wait_for(state["slots"].acquire(), timeout=kwargs["timeout"])
+        except asyncio.TimeoutError:
+            logger.warning("AI gateway saturated, rejecting %s request", model)
+            raise AIServiceBusy()
+        try:
+            response = await state["client"].chat.completions.create(**kwargs)
+        finally:
+            state["slots"].release()
+        return response.choices[0].message.content
+
+    async def acomplete_many(self, requests: list, concurrency: int = None, return_exceptions: bool = True) -> list:
+        """Awaitable `complete_many`, for callers already running inside an event loop."""
+        limiter = asyncio.Semaphore(concurrency or self.max_concurrency)
+
+        async def _one(request_kwargs):
+            async with limiter:
+                return await self.acomplete(**request_kwargs)
+
+        return await asyncio.gather(
+            *[_one(request_kwargs) for request_kwargs in requests],
+            return_exceptions=return_exceptions,
+        )
+
+    def complete_many(self, requests: list, concurrency: int = None, return_exceptions: bool = True) -> list:
+        """
+        Runs several completions concurrently from sync code (e.g. a Celery task).
+
+        :param requests: list of kwargs dicts accepted by `acomplete`
+        :param concurrency: optional cap lower than the gateway's own limit
+        :return: results in the same order; failed calls are returned as exceptions
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # blocking here would stall that loop, and deadlock it if it is the gateway's own
+            raise RuntimeError("complete_many() blocks; await acomplete_many() from async code instead")
+
+        return asyncio.run_coroutine_threadsafe(
+            self.acomplete_many(requests, concurrency, return_exceptions), self._get_loop()
+        ).result()
+
+ai_gateway = AIGateway(
+    api_key=settings.OPENAI_API_KEY,
+    timeout=settings.OPENAI_TIMEOUT,
+    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+    max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+)
+
 
 class OpenAIClient:
     @staticmethod
-    def generate_response(prompt: str) -> str:
+    def generate_response(prompt: str, timeout: float = None, cache_ttl: int = None,
+                          cache_namespace: str = "default", cache_validator=None) -> str:
         try:
-            response = client.chat.completions.create(model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful wellness assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7)
-            return response.choices[0].message.content
+            return ai_gateway.complete(
+                AIGateway.build_messages(prompt, WELLNESS_SYSTEM_PROMPT),
+                timeout=timeout,
+                cache_ttl=cache_ttl,
+                cache_namespace=cache_namespace,
+                cache_validator=cache_validator,
+            )
+        except AIServiceBusy:
+            raise
         except Exception as e:
             raise serializers.ValidationError(
                     {"message": f"Error: {str(e)}", "status":"failed"},
                     code=400
                 )
-            
+
     @staticmethod
-    def generate_response_list(prompt: str):
-        try:
-            response = client.chat.completions.create(model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful wellness assistant."},
-                {"role": "user", "content": prompt}
+    def generate_responses(prompts: list, concurrency: int = None, timeout: float = None) -> list:
+        """Concurrent `generate_response`; None in place of any call that failed."""
+        results = ai_gateway.complete_many(
+            [
+                {"messages": AIGateway.build_messages(prompt, WELLNESS_SYSTEM_PROMPT), "timeout": timeout}
+                for prompt in prompts
             ],
-            temperature=0.7)
-            return response.choices[0].message.content
-        except Exception as e:
-            raise serializers.ValidationError(
-                    {"message": f"Error: {str(e)}", "status":"failed"},
-                    code=400
-                )
+            concurrency=concurrency,
+        )
+        responses = []
+        for content in results:
+            if isinstance(content, Exception):
+                logger.error(f"AI call failed: {content}")
+                responses.append(None)
+                continue
+            responses.append(content or None)
+        return responses
 
     @staticmethod
-    def generate_daily_meal_plan(prompt):
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
+    def generate_response_list(prompt: str, timeout: float = None, cache_ttl: int = None,
+                               cache_namespace: str = "default", cache_validator=None):
+        return OpenAIClient.generate_response(
+            prompt, timeout=timeout, cache_ttl=cache_ttl,
+            cache_namespace=cache_namespace, cache_validator=cache_validator,
         )
+
+    @staticmethod
+    def generate_daily_meal_plan(prompt, timeout: float = None):
+        content = ai_gateway.complete(AIGateway.build_messages(prompt), timeout=timeout)
         try:
-            content = response.choices[0].message.content
             return json.loads(content)
         except json.JSONDecodeError as e:
             print("⚠️ Failed to parse AI JSON:", e)
@@ -61,18 +290,37 @@ class OpenAIClient:
         except Exception as e:
             print("Error parsing meal plan:", e)
             return None
-        
+
     @staticmethod
-    def chat(prompt):
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
+    def generate_daily_meal_plans(prompts: list, concurrency: int = None, timeout: float = None) -> list:
+        """Concurrent `generate_daily_meal_plan`; None in place of any plan that failed or didn't parse."""
+        results = ai_gateway.complete_many(
+            [{"messages": AIGateway.build_messages(prompt), "timeout": timeout} for prompt in prompts],
+            concurrency=concurrency,
         )
-        return response.choices[0].message.content
-    
+        plans = []
+        for content in results:
+            if isinstance(content, Exception):
+                logger.error(f"Error generating meal plan: {content}")
+                plans.append(None)
+                continue
+            try:
+                plans.append(json.loads(content))
+            except (TypeError, json.JSONDecodeError) as e:
+                logger.warning(f"Failed to parse AI meal plan JSON: {e}")
+                plans.append(None)
+        return plans
+
     @staticmethod
-    def chat_with_base64_image(base64_image: str, text: str = "", context: str = ""):
+    def chat(prompt, timeout: float = None, cache_ttl: int = None,
+             cache_namespace: str = "default", cache_validator=None):
+        return ai_gateway.complete(
+            AIGateway.build_messages(prompt), timeout=timeout, cache_ttl=cache_ttl,
+            cache_namespace=cache_namespace, cache_validator=cache_validator,
+        )
+
+    @staticmethod
+    def chat_with_base64_image(base64_image: str, text: str = "", context: str = "", timeout: float = None):
         try:
             messages = [
                 {"role": "system", "content": f"You are a helpful fitness assistant. {context}"},
@@ -93,13 +341,15 @@ class OpenAIClient:
                 }
             ]
 
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                max_tokens=800
+            return ai_gateway.complete(
+                messages,
+                model=VISION_MODEL,
+                temperature=None,
+                max_tokens=800,
+                timeout=timeout,
             )
-
-            return response.choices[0].message.content
+        except AIServiceBusy:
+            raise
         except Exception as e:
             print(f"Error in chat_with_base64_image: {str(e)}")
-            raise VerificationFailed(f"{str(e)}")
\ No newline at end of file
+            raise VerificationFailed(f"{str(e)}")
@@ -1,4 +1,5 @@
 import abc
+from functools import lru_cache
 
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
@@ -8,19 +9,43 @@ logger = logging.getLogger(__name__)
 
 class DeviceInterface(abc.ABC):
     @abc.abstractmethod
-    def send_push_notification(
-        self, title: str, body: str, registration_token: str
-    ) -> None:
+    def build_payload(self, title: str, body: str, route: str = None) -> dict:
+        """Platform-specific `messaging.Message` kwargs, everything except the token(s)."""
         pass
 
+    @lru_cache(maxsize=1024)
+    def payload_template(self, title: str, body: str, route: str = None) -> dict:
+        """
+        `build_payload` built once per (title, body, route) and reused; only the token
+        changes between messages of a fan-out. Platform instances are shared (see
+        `push_device`), so the cache lives as long as the worker.
+        """
+        return self.build_payload(title, body, route)
+
+    def build_message(self, title: str, body: str, registration_token: str, route: str = None) -> messaging.Message:
+        return messaging.Message(token=registration_token, **self.payload_template(title, body, route))
 
-class WebPushNotification(DeviceInterface):
     def send_push_notification(
         self, title: str, body: str, registration_token: str, route: str = None
-    ) -> None:
-        """Send web push notifications to users"""
-        message = messaging.Message(
-            webpush=messaging.WebpushConfig(
+    ) -> str:
+        message = self.build_message(title, body, registration_token, route)
+        response = messaging.send(message)
+        logger.info("Successfully sent %s push message: %s", self.__class__.__name__, response)
+        return response
+
+    def send_multicast(
+        self, title: str, body: str, registration_tokens: list, route: str = None
+    ) -> messaging.BatchResponse:
+        """One FCM request for up to 500 tokens sharing the same payload."""
+        message = messaging.MulticastMessage(tokens=registration_tokens, **self.payload_template(title, body, route))
+        return messaging.send_each_for_multicast(message)
+
+
+class WebPushNotification(DeviceInterface):
+    def build_payload(self, title: str, body: str, route: str = None) -> dict:
+        """Web push notifications to users"""
+        return {
+            "webpush": messaging.WebpushConfig(
                 notification=messaging.WebpushNotification(
                     title="FundusAI",
                     body=f"{title}",
@@ -28,20 +53,15 @@ class WebPushNotification(DeviceInterface):
                 ),
                 data={"summary": f"{body}"},
             ),
-            data={"route": route} if route else {},
-            token=registration_token,
-        )
-        response = messaging.send(message)
-        logger.info(f"Successfully sent message: {response}")
+            "data": {"route": route} if route else {},
+        }
 
 
 class AndroidPushNotification(DeviceInterface):
-    def send_push_notification(
-        self, title: str, body: str, registration_token: str, route: str = None
-    ) -> None:
-        """Send push notifications to Android devices"""
-        message = messaging.Message(
-            android=messaging.AndroidConfig(
+    def build_payload(self, title: str, body: str, route: str = None) -> dict:
+        """Push notifications to Android devices"""
+        return {
+            "android": messaging.AndroidConfig(
                 notification=messaging.AndroidNotification(
                     title=title,
                     body=body,
@@ -49,21 +69,15 @@ class AndroidPushNotification(DeviceInterface):
                     color="#00BCD4",  # More enticing, modern teal
                 ),
             ),
-            data={"route": route} if route else {},
-            token=registration_token,
-        )
-        response = messaging.send(message)
-        print(f"Successfully sent Android push message: {response}")
-        logger.info("Successfully sent Android push message: %s", response)
+            "data": {"route": route} if route else {},
+        }
 
 
 class IOSPushNotification(DeviceInterface):
-    def send_push_notification(
-        self, title: str, body: str, registration_token: str, route: str = None
-    ) -> None:
-        """Send push notifications to iOS devices"""
-        message = messaging.Message(
-            apns=messaging.APNSConfig(
+    def build_payload(self, title: str, body: str, route: str = None) -> dict:
+        """Push notifications to iOS devices"""
+        return {
+            "apns": messaging.APNSConfig(
                 payload=messaging.APNSPayload(
                     aps=messaging.Aps(
                         alert=messaging.ApsAlert(title=title, body=body),
@@ -75,11 +89,23 @@ class IOSPushNotification(DeviceInterface):
                     image="https://res.cloudinary.com/dv86ryr55/image/upload/v1749732930/Niigma_logo_sbuu9t.jpg"  # URL to the icon
                 ),
             ),
-            data={"route": route} if route else {},
-            token=registration_token,
-        )
-        response = messaging.send(message)
-        logger.info("Successfully sent iOS push message: %s", response)
+            "data": {"route": route} if route else {},
+        }
+
+
+# stateless, so one instance per platform serves every message (and keeps its payload cache warm)
+PUSH_DEVICES = {
+    "web": WebPushNotification(),
+    "android": AndroidPushNotification(),
+    "ios": IOSPushNotification(),
+}
+
+
+def push_device(device_type: str) -> DeviceInterface:
+    try:
+        return PUSH_DEVICES[device_type]
+    except KeyError:
+        raise ValueError("Unsupported device type")
 
 
 class PushNotificationService:
@@ -87,18 +113,17 @@ class PushNotificationService:
 
     def __init__(self, device_type, device=None):
         self.device_type = device_type
-        self.device = device
-        
-        if self.device_type == "web":
-            self.device = WebPushNotification()
-        elif self.device_type == "android":
-            self.device = AndroidPushNotification()
-        elif self.device_type == "ios":
-            self.device = IOSPushNotification()
-        else:
-            raise ValueError("Unsupported device type")
+        self.device = push_device(device_type)
 
     def send_push_notification(
         self, title: str, body: str, registration_token: str, route: str = None
     ) -> None:
-        self.device.send_push_notification(title, body, registration_token, route)
\ No newline at end of file
+        self.device.send_push_notification(title, body, registration_token, route)
+
+    def build_message(self, title: str, body: str, registration_token: str, route: str = None) -> messaging.Message:
+        return self.device.build_message(title, body, registration_token, route)
+
+    def send_multicast(
+        self, title: str, body: str, registration_tokens: list, route: str = None
+    ) -> messaging.BatchResponse:
+        return self.device.send_multicast(title, body, registration_tokens, route)
\ No newline at end of file
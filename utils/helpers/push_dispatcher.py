@@ -0,0 +1,176 @@
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+
+from django.conf import settings
+from django.utils import timezone
+from firebase_admin import messaging
+
+from .fcm import push_device
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TokenResult:
+    token: str
+    success: bool
+    message_id: str = None
+    error_code: str = None
+
+
+# FCM outcomes meaning the token will never work again
+DEAD_TOKEN_ERRORS = {"UNREGISTERED", "INVALID_ARGUMENT"}
+
+
+def fcm_error_code(exception) -> str:
+    """FCM error code for a failed send (the exception's own `code` is the generic HTTP one)."""
+    if isinstance(exception, messaging.UnregisteredError):
+        return "UNREGISTERED"
+    if isinstance(exception, messaging.SenderIdMismatchError):
+        return "SENDER_ID_MISMATCH"
+    if isinstance(exception, messaging.QuotaExceededError):
+        return "QUOTA_EXCEEDED"
+    return getattr(exception, "code", None) or type(exception).__name__
+
+
+def mark_tokens_dead(tokens) -> int:
+    """Flags the users holding these tokens so later fan-outs skip them."""
+    from accounts.models import User
+
+    tokens = list(tokens)
+    if not tokens:
+        return 0
+    return User.objects.filter(device_token__in=tokens, device_token_dead_at__isnull=True).update(
+        device_token_dead_at=timezone.now()
+    )
+
+
+@dataclass
+class DeliveryReport:
+    results: list = field(default_factory=list)
+    pruned: int = 0
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for result in self.results if result.success)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for result in self.results if not result.success)
+
+    @property
+    def dead_tokens(self) -> set:
+        return {result.token for result in self.results if result.error_code in DEAD_TOKEN_ERRORS}
+
+    def __str__(self):
+        return f"sent={self.sent} failed={self.failed} pruned={self.pruned}"
+
+
+class PushDispatcher:
+    """
+    Fan-out sender: pushes with the same device type, title, body and route are
+    grouped and sent with `send_each_for_multicast`, 500 tokens per request, with
+    the requests spread over a bounded thread pool. Personalised one-off messages
+    are packed 500 to a `send_each` request instead.
+
+        dispatcher = PushDispatcher()
+        for user in users:
+            dispatcher.add(user.device_type, user.device_token, title, message, route)
+        report = dispatcher.dispatch()
+    """
+
+    def __init__(self, batch_size: int = None, max_workers: int = None, flush_at: int = None,
+                 prune_dead_tokens: bool = True):
+        """
+        :param flush_at: when set, `add` sends what is queued once this many tokens are
+            pending, so a streamed recipient list is never held in memory whole
+        :param prune_dead_tokens: mark tokens FCM rejects as unregistered/invalid dead on the user
+        """
+        self.batch_size = min(batch_size or settings.PUSH_MULTICAST_BATCH_SIZE, settings.PUSH_MULTICAST_BATCH_SIZE)
+        self.max_workers = max_workers or settings.PUSH_DISPATCH_WORKERS
+        self.flush_at = flush_at
+        self.prune_dead_tokens = prune_dead_tokens
+        self.groups = defaultdict(list)
+        self.report = DeliveryReport()
+
+    def add(self, device_type: str, registration_token: str, title: str, body: str, route: str = None):
+        if not registration_token or not device_type:
+            return
+        self.groups[(device_type, title, body, route)].append(registration_token)
+        if self.flush_at and len(self) >= self.flush_at:
+            self.flush()
+
+    def __len__(self):
+        return sum(len(tokens) for tokens in self.groups.values())
+
+    def batches(self):
+        """
+        (send, tokens) jobs. Shared payloads go out as multicasts; one-off personalised
+        messages (a single token each) are packed together into `send_each` calls.
+        """
+        singles = []
+        for (device_type, title, body, route), tokens in self.groups.items():
+            if len(tokens) == 1:
+                singles.append((device_type, title, body, route, tokens[0]))
+                continue
+            for start in range(0, len(tokens), self.batch_size):
+                chunk = tokens[start:start + self.batch_size]
+                yield partial(self._multicast, device_type, title, body, route, chunk), chunk
+        for start in range(0, len(singles), self.batch_size):
+            chunk = singles[start:start + self.batch_size]
+            yield partial(self._send_each, chunk), [item[-1] for item in chunk]
+
+    def flush(self):
+        """Sends everything queued so far; results accumulate on `self.report`."""
+        if not self.groups:
+            return
+        flushed = DeliveryReport()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for results in executor.map(lambda job: self._send_batch(*job), self.batches()):
+                flushed.results.extend(results)
+        self.groups.clear()
+
+        if self.prune_dead_tokens:
+            self.report.pruned += mark_tokens_dead(flushed.dead_tokens)
+        self.report.results.extend(flushed.results)
+
+    def dispatch(self) -> DeliveryReport:
+        """Sends what is left and returns the report for everything this dispatcher sent."""
+        self.flush()
+        report, self.report = self.report, DeliveryReport()
+        logger.info(f"Push dispatch finished: {report}")
+        return report
+
+    @staticmethod
+    def _multicast(device_type, title, body, route, tokens):
+        return push_device(device_type).send_multicast(title, body, tokens, route)
+
+    @staticmethod
+    def _send_each(items):
+        return messaging.send_each([
+            push_device(device_type).build_message(title, body, token, route)
+            for device_type, title, body, route, token in items
+        ])
+
+    @staticmethod
+    def _send_batch(send, tokens) -> list:
+        try:
+            response = send()
+        except Exception as e:
+            # the whole request failed (auth, network, bad payload or device type): every token in it
+            # counts as failed, but none of them is blamed, so nothing gets pruned for it
+            logger.error(f"Push request for {len(tokens)} token(s) failed: {fcm_error_code(e)} {e}")
+            return [TokenResult(token, False, error_code="REQUEST_FAILED") for token in tokens]
+
+        return [
+            TokenResult(
+                token,
+                send_response.success,
+                message_id=send_response.message_id,
+                error_code=None if send_response.success else fcm_error_code(send_response.exception),
+            )
+            for token, send_response in zip(tokens, response.responses)
+        ]
@@ -1,5 +1,14 @@
+import json
+import uuid
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPageNumberPagination(pagination.PageNumberPagination):
@@ -24,4 +33,162 @@ class CustomPageNumberPagination(pagination.PageNumberPagination):
             'from': self.get_from(),
             'to': self.get_to(),
             'results': data
-        })
\ No newline at end of file
+        })
+
+class KeysetCursorPagination(pagination.BasePagination):
+    """
+    Cursor pagination for append-heavy feeds read newest first. Pages are keyed on
+    (created_at, id), so page N is an index range scan from the cursor instead of an
+    OFFSET over everything before it, and the total count is only computed when the
+    client asks for it with `?include_count=true`.
+
+    Cursor mode is opt-in: a client starts it with `?pagination=cursor` and then
+    follows the `next`/`previous` links, which carry `?cursor=`. Every other request
+    is served by CustomPageNumberPagination with its count, as before.
+    Needs an index on (created_at, id) on the paginated table.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+    legacy_page_query_param = 'page'
+    mode_query_param = 'pagination'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if not self.wants_cursor(request):
+            self.legacy = CustomPageNumberPagination()
+            return self.legacy.paginate_queryset(queryset, request, view)
+        self.legacy = None
+
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if self.wants_count(request) else None
+        position = self.decode_cursor(request)
+
+        if position is None or not position["reverse"]:
+            queryset = queryset.order_by(*self.ordering)
+            if position is not None:
+                queryset = queryset.filter(
+                    Q(created_at__lt=position["created_at"])
+                    | Q(created_at=position["created_at"], id__lt=position["id"])
+                )
+            rows = list(queryset[:self.page_size + 1])
+            self.has_next = len(rows) > self.page_size
+            self.page = rows[:self.page_size]
+            self.has_previous = position is not None
+        else:
+            # walking back towards newer rows: read them oldest first, then flip
+            queryset = queryset.order_by('created_at', 'id').filter(
+                Q(created_at__gt=position["created_at"])
+                | Q(created_at=position["created_at"], id__gt=position["id"])
+            )
+            rows = list(queryset[:self.page_size + 1])
+            self.has_previous = len(rows) > self.page_size
+            self.page = list(reversed(rows[:self.page_size]))
+            self.has_next = True
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def wants_cursor(self, request):
+        params = request.query_params
+        if self.legacy_page_query_param in params:
+            return False
+        return bool(params.get(self.cursor_query_param)) or params.get(self.mode_query_param, '').lower() == 'cursor'
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(b64decode(padded.encode('ascii'), altchars=b'-_').decode('utf-8'))
+            return {
+                "created_at": datetime.fromisoformat(payload["c"]),
+                "id": uuid.UUID(payload["i"]),
+                "reverse": bool(payload.get("r")),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse=False):
+        payload = {"c": row.created_at.isoformat(), "i": str(row.id)}
+        if reverse:
+            payload["r"] = 1
+        encoded = b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'), altchars=b'-_').decode('ascii').rstrip('=')
+        url = remove_query_param(self.request.build_absolute_uri(), self.legacy_page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.legacy:
+            return self.legacy.get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if self.legacy:
+            return self.legacy.get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_count(self):
+        """Total rows, or None in cursor mode unless `include_count` was requested."""
+        if self.legacy:
+            return self.legacy.page.paginator.count
+        return self.count
+
+    def get_paginated_response(self, data):
+        if self.legacy:
+            return self.legacy.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'count': self.count,
+            'per_page': self.page_size,
+            'results': data
+        })
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Send `cursor` to page with cursors instead of page numbers.',
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor taken from a `next`/`previous` link.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Results per page, at most {self.max_page_size}.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Also return the total count (an extra COUNT query).',
+                'schema': {'type': 'boolean'},
+            },
+        ]